@@ -0,0 +1,375 @@
+"""
+Offline benchmark harness. GitHub is replayed by fake_github and the LLM by
+canned completions, so runs are repeatable, need no API keys and cost no
+quota. Measures latency percentiles and throughput under concurrent load for
+get_competency_map, extract_resume_skills, calculate_fit, calculate_fit_batch,
+analyse_jd and the /full-analysis route, and writes a JSON report:
+
+    python benchmark.py --repos 500 --concurrency 8 --output benchmark_report.json
+    python benchmark.py --compare benchmark_report.json   # diff against an earlier run
+
+--profile loads recorded repos ({username: [repo, ...]} in the format of
+fake_github.synthetic_profile) instead of generating them.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Read by the app modules at import time: keep caches in memory and lift the
+# Groq budgets so the scheduler doesn't throttle canned completions.
+os.environ["FITR_CACHE_DB"] = ""
+os.environ["LLM_RPM"] = "1000000000"
+os.environ["LLM_TPM"] = "1000000000000"
+os.environ.setdefault("GITHUB_TOKEN", "benchmark-token")
+os.environ.setdefault("GROQ_API_KEY", "benchmark-key")
+
+from langchain_core.language_models.chat_models import SimpleChatModel
+from fake_github import FakeGitHub, synthetic_profile
+
+SKILL_LINES = [
+    "Built REST APIs with FastAPI and PostgreSQL, deployed with Docker on AWS.",
+    "Trained deep learning models in PyTorch and TensorFlow for computer vision.",
+    "Machine learning pipelines with pandas, numpy and scikit-learn.",
+    "Wrote React and JavaScript frontends; maintained the Git workflow on GitHub.",
+    "Prototyped LLM agents with LangChain; natural language processing with spaCy.",
+    "Led a team of four students; organised the university coding club.",
+]
+
+JD_TEMPLATE = """Backend Engineering Intern #{n}
+About us: we build hiring tools.
+Requirements:
+- Python, FastAPI, SQL and Git
+- Docker
+Nice to have:
+- Kubernetes, AWS
+Stipend: ₹15,000/month"""
+
+CANNED_JD = {
+    "hard_skills": ["Python", "FastAPI", "SQL", "Git", "Docker"],
+    "quick_learn_skills": ["Docker"],
+    "role_summary": "Backend engineering internship",
+    "stipend": "₹15,000/month"
+}
+
+CANNED_LETTER = (
+    "Dear Hiring Manager,\n\nI am applying for the backend internship. My GitHub shows "
+    "production FastAPI services and containerised deployments.\n\nSincerely,\nCandidate"
+)
+
+class CannedChatModel(SimpleChatModel):
+    """Answers each prompt kind with a fixed completion after `latency` seconds."""
+
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "canned"
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = messages[-1].content
+        if "JSON array" in prompt:
+            count = prompt.count("Job Description ")
+            return json.dumps([dict(CANNED_JD, id=n) for n in range(count)])
+        if "valid JSON" in prompt:
+            return json.dumps(CANNED_JD)
+        return CANNED_LETTER
+
+def check_fit_batch(competency_maps: List[Dict[str, Any]], jd_analyses: List[Dict[str, Any]]) -> bool:
+    """
+    Whether calculate_fit_batch gives the same result as calculate_fit for
+    every (competency map, JD) pair, printing the pairs that differ.
+    """
+    from fit_scorer import calculate_fit, calculate_fit_batch
+    ok = True
+    for result in calculate_fit_batch(competency_maps, jd_analyses):
+        c, j = result.pop("candidate_index"), result.pop("jd_index")
+        expected = calculate_fit(competency_maps[c], jd_analyses[j])
+        if result != expected:
+            ok = False
+            print(f"calculate_fit_batch differs for map {c}, JD {j}: {result} != {expected}")
+    return ok
+
+def make_pdf(pages: List[str]) -> bytes:
+    """Builds a minimal text PDF (Helvetica, one text object per page)."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        lines = " ".join(
+            "(%s) '" % line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            for line in text.split("\n")
+        )
+        stream = f"BT /F1 9 Tf 40 800 Td 11 TL {lines} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(len(objects))
+    objects[1] = "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{k} 0 R" for k in kids), len(kids))
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+def large_resume(pages: int, seed: int = 0, tag: str = "") -> bytes:
+    rng = random.Random(seed)
+    return make_pdf([
+        f"Candidate {tag} page {page + 1}\n" + "\n".join(rng.choice(SKILL_LINES) for _ in range(65))
+        for page in range(pages)
+    ])
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+def summarize(latencies: List[float], wall: float, concurrency: int, errors: int = 0) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "iterations": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "mean": ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+            "p50": ms(percentile(ordered, 50)),
+            "p90": ms(percentile(ordered, 90)),
+            "p99": ms(percentile(ordered, 99)),
+            "max": ms(ordered[-1]) if ordered else 0.0
+        }
+    }
+
+def run_threads(fn: Callable[[int], Any], iterations: int, concurrency: int) -> Dict[str, Any]:
+    """Calls fn(i) for i in range(iterations) on `concurrency` threads, timing each call."""
+    latencies: List[float] = []
+    errors = 0
+
+    def timed_call(i: int) -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            result = fn(i)
+            if isinstance(result, dict) and "error" in result:
+                errors += 1
+        except Exception as e:
+            print(f"  call {i} failed: {e}")
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed_call, range(iterations)))
+    return summarize(latencies, time.perf_counter() - start, concurrency, errors)
+
+async def run_route(app: Any, make_request: Callable[[int], Dict[str, Any]], iterations: int, concurrency: int) -> Dict[str, Any]:
+    """Posts make_request(i) to the ASGI app in-process, `concurrency` requests at a time."""
+    import httpx
+
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        async def one(i: int) -> None:
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(**make_request(i))
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200 or "error" in response.json():
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one(i) for i in range(iterations)])
+    return summarize(latencies, time.perf_counter() - start, concurrency, errors)
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.profile:
+        with open(args.profile) as f:
+            recorded = json.load(f)
+        repos = next(iter(recorded.values()))
+    else:
+        repos = synthetic_profile(args.repos, seed=args.seed)
+
+    # Every cold iteration ingests a different user so neither the caches nor
+    # request coalescing can short-circuit it; all users share the same repos.
+    cold_users = [f"bench-cold-{i}" for i in range(args.iterations)]
+    profiles = {user: repos for user in cold_users + ["bench-warm", "bench-full"]}
+
+    results: Dict[str, Any] = {}
+    with FakeGitHub(profiles, rate_limit=10 ** 9, latency=args.github_latency) as fake:
+        os.environ["GITHUB_API_URL"] = fake.base_url
+
+        from clients import CLIENTS
+        from github_ingestor import get_competency_map
+        from resume_parser import extract_resume_skills
+        from fit_scorer import calculate_fit, calculate_fit_batch
+        from jd_analyser import analyse_jd
+        import main
+
+        CLIENTS.llms[0.3] = CannedChatModel(latency=args.llm_latency)
+
+        def case(name: str, result: Dict[str, Any]) -> None:
+            results[name] = result
+            latency = result["latency_ms"]
+            print(f"{name:<34} p50 {latency['p50']:>10.2f} ms  p99 {latency['p99']:>10.2f} ms  "
+                  f"{result['throughput_per_s']:>9.2f}/s  errors {result['errors']}")
+
+        print(f"{len(repos)} repos per profile, concurrency {args.concurrency}")
+        case("get_competency_map.cold", run_threads(
+            lambda i: get_competency_map(f"https://github.com/{cold_users[i]}"), args.iterations, args.concurrency
+        ))
+        get_competency_map("https://github.com/bench-warm")
+        case("get_competency_map.warm", run_threads(
+            lambda i: get_competency_map("https://github.com/bench-warm"), args.iterations, args.concurrency
+        ))
+
+        # Distinct bytes per cold iteration so the content-hash cache misses.
+        cold_pdfs = [large_resume(args.pdf_pages, seed=args.seed, tag=str(i)) for i in range(args.iterations)]
+        warm_pdf = large_resume(args.pdf_pages, seed=args.seed, tag="warm")
+        extract_resume_skills(warm_pdf)
+        case("extract_resume_skills.cold", run_threads(
+            lambda i: extract_resume_skills(cold_pdfs[i]), args.iterations, args.concurrency
+        ))
+        case("extract_resume_skills.warm", run_threads(
+            lambda i: extract_resume_skills(warm_pdf), args.iterations, args.concurrency
+        ))
+
+        competency_map = get_competency_map("https://github.com/bench-warm")
+        jd_analysis = analyse_jd(JD_TEMPLATE.format(n="fit"), mode="fast")
+        case("calculate_fit", run_threads(
+            lambda i: calculate_fit(competency_map, jd_analysis), args.iterations * 100, 1
+        ))
+
+        # JDs without hard skills (what a failed JD analysis returns) in the
+        # middle and at the end of the batch.
+        batch_maps = [competency_map, {"Python": 0.9, "backend": 1.0}, {}]
+        batch_jds = [
+            jd_analysis,
+            {"hard_skills": ["Python"], "legitimacy_score": 100},
+            {"hard_skills": [], "quick_learn_skills": ["Docker"], "legitimacy_score": 80},
+            {"hard_skills": ["Python", "FastAPI", "Rust"], "quick_learn_skills": ["Rust"], "legitimacy_score": 60},
+            {"hard_skills": []},
+            {"hard_skills": [], "legitimacy_score": 100}
+        ]
+        if not check_fit_batch(batch_maps, batch_jds):
+            raise SystemExit("calculate_fit_batch disagrees with calculate_fit")
+        batch_jds = [analyse_jd(JD_TEMPLATE.format(n=f"batch-{i}"), mode="fast") for i in range(100)]
+        case("calculate_fit_batch", run_threads(
+            lambda i: calculate_fit_batch([competency_map], batch_jds), args.iterations * 10, 1
+        ))
+
+        case("analyse_jd.llm", run_threads(
+            lambda i: analyse_jd(JD_TEMPLATE.format(n=f"llm-{i}")), args.iterations * 10, args.concurrency
+        ))
+        case("analyse_jd.fast", run_threads(
+            lambda i: analyse_jd(JD_TEMPLATE.format(n=f"fast-{i}"), mode="fast"), args.iterations * 10, 1
+        ))
+
+        # Steady state: the profile is already ingested (cold ingest has its own
+        # case above), so this measures the route's own overhead and fan-out.
+        get_competency_map("https://github.com/bench-full")
+        resume = large_resume(args.pdf_pages, seed=args.seed, tag="full")
+        def full_analysis_request(i: int) -> Dict[str, Any]:
+            return {
+                "url": "/full-analysis",
+                "data": {"github_url": "https://github.com/bench-full", "jd_text": JD_TEMPLATE.format(n=f"full-{i}")},
+                "files": {"resume": ("resume.pdf", resume, "application/pdf")}
+            }
+        case("full_analysis", asyncio.run(run_route(
+            main.app, full_analysis_request, args.iterations * 4, args.concurrency
+        )))
+
+    return {
+        "schema": 1,
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "repos": len(repos),
+            "profile": args.profile,
+            "pdf_pages": args.pdf_pages,
+            "pdf_bytes": len(warm_pdf),
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "github_latency_s": args.github_latency,
+            "llm_latency_s": args.llm_latency,
+            "seed": args.seed
+        },
+        "results": results
+    }
+
+def compare(baseline: Dict[str, Any], report: Dict[str, Any]) -> None:
+    print(f"\nvs baseline from {baseline.get('started_at')} (commit {baseline.get('git_commit')}):")
+    for name, result in report["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            print(f"{name:<34} (new)")
+            continue
+        ratio = lambda new, prev: f"{new / prev:6.2f}x" if prev else "     -"
+        print(f"{name:<34} p50 {ratio(result['latency_ms']['p50'], old['latency_ms']['p50'])}  "
+              f"p99 {ratio(result['latency_ms']['p99'], old['latency_ms']['p99'])}  "
+              f"throughput {ratio(result['throughput_per_s'], old['throughput_per_s'])}")
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline Fitr benchmark (fake GitHub, canned LLM).")
+    parser.add_argument("--repos", type=int, default=500, help="repos in the synthetic profile")
+    parser.add_argument("--profile", help="JSON file of recorded repos to replay instead of a synthetic profile")
+    parser.add_argument("--pdf-pages", type=int, default=20, help="pages in the generated resume PDF")
+    parser.add_argument("--iterations", type=int, default=5, help="base iteration count per case")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--github-latency", type=float, default=0.0, help="seconds added to each fake GitHub reply")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds added to each canned LLM completion")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_report.json")
+    parser.add_argument("--compare", help="earlier report to compare this run against")
+    args = parser.parse_args(argv)
+
+    # Loaded up front in case --output overwrites the baseline file.
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    report = run_benchmarks(args)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+    if baseline is not None:
+        compare(baseline, report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
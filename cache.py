@@ -0,0 +1,253 @@
+import json
+import os
+import asyncio
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from metrics import CACHE_LOOKUPS
+
+# Default on-disk store shared by every cache namespace. Set to "" to keep
+# caches purely in memory.
+CACHE_DB_PATH = os.getenv("FITR_CACHE_DB", "fitr_cache.db")
+# "sqlite" (shared by every worker process on the host) or "memory"
+# (per-process, nothing persisted).
+CACHE_BACKEND = os.getenv("FITR_CACHE_BACKEND", "sqlite")
+
+# (stored_at, version, value)
+Entry = Tuple[float, Optional[str], Any]
+
+class CacheBackend:
+    """
+    Shared tier behind TTLCache's in-process LRU, and the leases SingleFlight
+    uses to coalesce work across worker processes. This base class is the
+    in-process backend: it stores nothing, and every lease is granted
+    because there is no other process to coordinate with.
+    """
+    shared = False
+
+    def get(self, namespace: str, key: str) -> Optional[Entry]:
+        return None
+
+    def set(self, namespace: str, key: str, entry: Entry) -> None:
+        pass
+
+    def clear(self, namespace: str) -> None:
+        pass
+
+    def prune(self, namespace: str, ttl: float, max_entries: Optional[int] = None) -> None:
+        pass
+
+    def acquire_lease(self, name: str, key: str, ttl: float) -> Optional[str]:
+        """A token if this process now holds the lease on (name, key), None if another one does."""
+        return uuid.uuid4().hex
+
+    def release_lease(self, name: str, key: str, token: str) -> None:
+        pass
+
+    def lease_held(self, name: str, key: str) -> bool:
+        return False
+
+class SQLiteBackend(CacheBackend):
+    """
+    SQLite file in WAL mode: readers don't block the writer, so every worker
+    process on the host can share one cache file and lease table.
+    """
+    shared = True
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT, key TEXT, stored_at REAL, version TEXT, value TEXT, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            "name TEXT, key TEXT, token TEXT, expires_at REAL, "
+            "PRIMARY KEY (name, key))"
+        )
+        self._db.commit()
+
+    def get(self, namespace: str, key: str) -> Optional[Entry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT stored_at, version, value FROM cache WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    def set(self, namespace: str, key: str, entry: Entry) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, stored_at, version, value) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, entry[0], entry[1], json.dumps(entry[2]))
+            )
+            self._db.commit()
+
+    def clear(self, namespace: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+            self._db.commit()
+
+    def prune(self, namespace: str, ttl: float, max_entries: Optional[int] = None) -> None:
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM cache WHERE namespace = ? AND stored_at < ?",
+                (namespace, time.time() - ttl)
+            )
+            if max_entries is not None:
+                self._db.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key NOT IN ("
+                    "SELECT key FROM cache WHERE namespace = ? ORDER BY stored_at DESC LIMIT ?)",
+                    (namespace, namespace, max_entries)
+                )
+            self._db.commit()
+
+    def acquire_lease(self, name: str, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            # A lease left behind by a crashed worker expires instead of blocking forever.
+            self._db.execute("DELETE FROM leases WHERE name = ? AND key = ? AND expires_at < ?", (name, key, now))
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO leases (name, key, token, expires_at) VALUES (?, ?, ?, ?)",
+                (name, key, token, now + ttl)
+            )
+            self._db.commit()
+        return token if cursor.rowcount == 1 else None
+
+    def release_lease(self, name: str, key: str, token: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM leases WHERE name = ? AND key = ? AND token = ?", (name, key, token))
+            self._db.commit()
+
+    def lease_held(self, name: str, key: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM leases WHERE name = ? AND key = ? AND expires_at >= ?", (name, key, time.time())
+            ).fetchone()
+        return row is not None
+
+MEMORY_BACKEND = CacheBackend()
+_backends: Dict[str, CacheBackend] = {}
+_backends_lock = threading.Lock()
+
+def open_backend(db_path: Optional[str] = CACHE_DB_PATH) -> CacheBackend:
+    """
+    The backend for a store path, one per path per process: SQLite-WAL unless
+    FITR_CACHE_BACKEND=memory or no path is given. Falls back to memory if
+    the file can't be opened.
+    """
+    if not db_path or CACHE_BACKEND == "memory":
+        return MEMORY_BACKEND
+    with _backends_lock:
+        backend = _backends.get(db_path)
+        if backend is None:
+            try:
+                backend = SQLiteBackend(db_path)
+            except sqlite3.Error as e:
+                print(f"Warning: cache store {db_path} unavailable, using memory only: {e}")
+                backend = MEMORY_BACKEND
+            _backends[db_path] = backend
+    return backend
+
+class TTLCache:
+    """
+    Two-tier cache: an in-process LRU in front of a CacheBackend (by default
+    a SQLite file shared by all worker processes).
+    Entries expire after `ttl` seconds and each tier holds at most
+    `max_entries` per namespace. With `max_bytes` the in-process tier also
+    evicts least recently used entries once their JSON size adds up past it.
+    An entry may carry a `version` (e.g. a repo's pushed_at); a lookup with a
+    different version counts as a miss.
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 1024, ttl: float = 86400, db_path: Optional[str] = CACHE_DB_PATH, max_bytes: Optional[int] = None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._memory: "OrderedDict[str, Entry]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._backend = open_backend(db_path)
+
+    def get(self, key: str, version: Optional[str] = None) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None or now - entry[0] > self.ttl or entry[1] != version:
+                # Another worker may have stored a newer entry in the shared tier.
+                shared = self._backend.get(self.namespace, key)
+                if shared is not None:
+                    entry = shared
+                    self._remember(key, entry)
+            if entry is None or now - entry[0] > self.ttl or entry[1] != version:
+                self.misses += 1
+                CACHE_LOOKUPS.inc(cache=self.namespace, result="miss")
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            CACHE_LOOKUPS.inc(cache=self.namespace, result="hit")
+            return entry[2]
+
+    async def aget(self, key: str, version: Optional[str] = None) -> Optional[Any]:
+        """get() for coroutines: a shared backend is read on a worker thread, so
+        another worker holding the SQLite write lock can't stall the event loop."""
+        if not self._backend.shared:
+            return self.get(key, version)
+        return await asyncio.to_thread(self.get, key, version)
+
+    async def aset(self, key: str, value: Any, version: Optional[str] = None) -> None:
+        if not self._backend.shared:
+            return self.set(key, value, version)
+        await asyncio.to_thread(self.set, key, value, version)
+
+    def set(self, key: str, value: Any, version: Optional[str] = None) -> None:
+        entry = (time.time(), version, value)
+        with self._lock:
+            self._remember(key, entry)
+            self._backend.set(self.namespace, key, entry)
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._backend.prune(self.namespace, self.ttl, self.max_entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._sizes.clear()
+            self._memory_bytes = 0
+            self._backend.clear(self.namespace)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": len(self._memory),
+            "bytes": self._memory_bytes
+        }
+
+    def _remember(self, key: str, entry: Entry) -> None:
+        size = len(json.dumps(entry[2]))
+        self._memory_bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries or (
+            self.max_bytes is not None and self._memory_bytes > self.max_bytes and len(self._memory) > 1
+        ):
+            evicted, _ = self._memory.popitem(last=False)
+            self._memory_bytes -= self._sizes.pop(evicted)
@@ -0,0 +1,113 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+import httpx
+from github import Github
+from langchain_groq import ChatGroq
+
+# Connection pools shared by every request: GitHub (requests-based, via
+# PyGithub) and Groq (httpx, via ChatGroq).
+GITHUB_POOL_SIZE = int(os.getenv("GITHUB_POOL_SIZE", os.getenv("GITHUB_MAX_WORKERS", "8")))
+GITHUB_TIMEOUT = int(os.getenv("GITHUB_TIMEOUT", "15"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+# Idle keep-alive connections are closed after this many seconds.
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+MODEL_NAME = "llama-3.3-70b-versatile"
+
+class ClientRegistry:
+    """
+    Application-lifetime API clients. main.py opens the registry in the
+    FastAPI lifespan and closes it on shutdown; the ingestor and the LLM
+    modules get their clients from here instead of building one per call,
+    so requests reuse warm keep-alive connections. Clients are created on
+    first use, which also covers scripts that never run the lifespan.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._github: Dict[Tuple[str, Optional[str]], Github] = {}
+        self.llms: Dict[float, Any] = {}
+        self._http: Optional[httpx.Client] = None
+        self._ahttp: Optional[httpx.AsyncClient] = None
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=LLM_POOL_SIZE,
+            max_keepalive_connections=LLM_POOL_SIZE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        )
+
+    def open(self) -> None:
+        with self._lock:
+            if self._http is None:
+                self._http = httpx.Client(limits=self._limits(), timeout=LLM_TIMEOUT)
+            if self._ahttp is None:
+                self._ahttp = httpx.AsyncClient(limits=self._limits(), timeout=LLM_TIMEOUT)
+
+    async def aclose(self) -> None:
+        with self._lock:
+            http, ahttp = self._http, self._ahttp
+            github = list(self._github.values())
+            self._http = self._ahttp = None
+            self._github.clear()
+            self.llms.clear()
+        for g in github:
+            g.close()
+        if http is not None:
+            http.close()
+        if ahttp is not None:
+            await ahttp.aclose()
+
+    def github(self) -> Github:
+        """
+        The shared GitHub client for the configured API URL and token. One
+        persistent session with a GITHUB_POOL_SIZE connection pool serves every
+        ingest, including the per-repo worker threads.
+        """
+        base_url = os.getenv("GITHUB_API_URL", "https://api.github.com")
+        token = os.getenv("GITHUB_TOKEN")
+        key = (base_url, token)
+        g = self._github.get(key)
+        if g is None:
+            with self._lock:
+                g = self._github.get(key)
+                if g is None:
+                    # PyGithub spaces requests 0.25s apart by default, which would
+                    # serialise the worker pool; size the connection pool instead.
+                    options = {
+                        "base_url": base_url,
+                        "pool_size": GITHUB_POOL_SIZE,
+                        "timeout": GITHUB_TIMEOUT,
+                        "seconds_between_requests": None,
+                        "per_page": 100
+                    }
+                    if not token:
+                        print("Warning: GITHUB_TOKEN not found in environment.")
+                        g = Github(**options)
+                    else:
+                        g = Github(token, **options)
+                    self._github[key] = g
+        return g
+
+    def llm(self, temperature: float = 0.3) -> Any:
+        """The shared ChatGroq client for a temperature, on the registry's pooled HTTP clients."""
+        llm = self.llms.get(temperature)
+        if llm is None:
+            self.open()
+            with self._lock:
+                llm = self.llms.get(temperature)
+                if llm is None:
+                    llm = ChatGroq(
+                        model=MODEL_NAME,
+                        api_key=os.getenv("GROQ_API_KEY"),
+                        temperature=temperature,
+                        request_timeout=LLM_TIMEOUT,
+                        http_client=self._http,
+                        http_async_client=self._ahttp
+                    )
+                    self.llms[temperature] = llm
+        return llm
+
+CLIENTS = ClientRegistry()
@@ -1,24 +1,27 @@
-import time
 import os
-from langchain_groq import ChatGroq
+import json
+import time
+import hashlib
+from types import SimpleNamespace
 from langchain_core.prompts import PromptTemplate
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from clients import MODEL_NAME
+from llm_client import LLM_MAX_ATTEMPTS, get_llm, invoke_with_retry, ainvoke_with_retry, is_rate_limited, on_rate_limited
+from llm_scheduler import SCHEDULER, estimate_tokens
+from cache import TTLCache, open_backend
+from singleflight import SingleFlight
+from metrics import observe_stage, record_llm_usage, stage_timer
 
-def generate_cover_letter(fit_result: Dict[str, Any], competency_map: Dict[str, float], role_summary: str, github_url: str) -> str:
-    # Extract top 3 skills by score
-    sorted_skills = sorted(competency_map.items(), key=lambda item: item[1], reverse=True)
-    top_3_skills = ", ".join([skill[0] for skill in sorted_skills[:3]])
-    
-    # Extract GitHub username
-    username = github_url.rstrip('/').split('/')[-1]
-    
-    # Extract gap skill if it exists
-    hard_missing = fit_result.get('hard_missing', [])
-    gap_skill = hard_missing[0] if hard_missing else None
-    
-    gap_instruction = f"Address this skill gap constructively: {gap_skill}" if gap_skill else ""
-    
-    prompt_template = """Write a confident, specific cover letter for a {role_summary} internship.
+# "llm" waits for the Groq letter; "draft" answers at once with a locally
+# templated letter and generates the LLM one in the background.
+COVER_LETTER_MODES = ("llm", "draft")
+COVER_LETTER_MODE = os.getenv("COVER_LETTER_MODE", "llm")
+
+# Bump whenever the prompt changes so letters cached for the old prompt are not reused.
+PROMPT_VERSION = "1"
+
+PROMPT = PromptTemplate(
+    template="""Write a confident, specific cover letter for a {role_summary} internship.
 
 Format the cover letter structurally with excellent spacing:
 - Use a professional greeting (e.g., Dear Hiring Manager,)
@@ -31,47 +34,222 @@ Details to include:
 - Reference their GitHub profile explicitly: {github_url}
 - {gap_instruction}
 
-Rules: 
-- Be direct and professional. No fluff. 
-- Lead with capability and evidence from GitHub. 
+Rules:
+- Be direct and professional. No fluff.
+- Lead with capability and evidence from GitHub.
 - Keep it concise, around 150-200 words.
-- Do not use markdown formatting like bolding (**), just return beautifully spaced plain text."""
+- Do not use markdown formatting like bolding (**), just return beautifully spaced plain text.""",
+    input_variables=["role_summary", "top_3_skills", "github_url", "username", "gap_instruction"]
+)
+
+FALLBACK_LETTER = "Dear Hiring Manager,\n\nI am writing to express my strong interest in this position. Please find my qualifications attached.\n\nSincerely,\nCandidate"
+
+# LLM letters keyed by a hash of the exact prompt inputs, model and prompt
+# version; least recently used letters are evicted past COVER_LETTER_CACHE_SIZE.
+LETTER_CACHE = TTLCache(
+    "cover_letter",
+    max_entries=int(os.getenv("COVER_LETTER_CACHE_SIZE", "2000")),
+    ttl=float(os.getenv("COVER_LETTER_CACHE_TTL", "604800"))
+)
+
+# Concurrent requests for a letter with identical prompt inputs share one LLM call,
+# across worker processes too when the cache backend is shared.
+LETTER_FLIGHT = SingleFlight("cover_letter", open_backend())
 
-    prompt = PromptTemplate(
-        template=prompt_template, 
-        input_variables=["role_summary", "top_3_skills", "github_url", "username", "gap_instruction"]
-    )
-    
+def cache_stats() -> Dict[str, Any]:
+    return LETTER_CACHE.stats()
+
+def coalescing_stats() -> Dict[str, Any]:
+    return LETTER_FLIGHT.stats()
+
+def letter_cache_key(inputs: Dict[str, str]) -> str:
+    payload = json.dumps(inputs, sort_keys=True)
+    return hashlib.sha256(f"{MODEL_NAME}\0{PROMPT_VERSION}\0{payload}".encode("utf-8")).hexdigest()
+
+def check_mode(mode: Optional[str]) -> str:
+    mode = mode or COVER_LETTER_MODE
+    if mode not in COVER_LETTER_MODES:
+        raise ValueError(f"Unknown cover letter mode {mode!r}, expected one of {', '.join(COVER_LETTER_MODES)}")
+    return mode
+
+def _top_skills(competency_map: Dict[str, float]) -> List[str]:
+    sorted_skills = sorted(competency_map.items(), key=lambda item: item[1], reverse=True)
+    return [skill[0] for skill in sorted_skills[:3]]
+
+def _gap_skill(fit_result: Dict[str, Any]) -> Optional[str]:
+    hard_missing = fit_result.get('hard_missing', [])
+    return hard_missing[0] if hard_missing else None
+
+def prompt_inputs(fit_result: Dict[str, Any], competency_map: Dict[str, float], role_summary: str, github_url: str) -> Dict[str, str]:
+    """The PROMPT variables for a letter; identical inputs get the same cached letter."""
+    # Extract top 3 skills by score
+    top_3_skills = ", ".join(_top_skills(competency_map))
+
+    # Extract GitHub username
+    username = github_url.rstrip('/').split('/')[-1]
+
+    # Extract gap skill if it exists
+    gap_skill = _gap_skill(fit_result)
+
+    gap_instruction = f"Address this skill gap constructively: {gap_skill}" if gap_skill else ""
+
+    return {
+        "role_summary": role_summary,
+        "top_3_skills": top_3_skills,
+        "github_url": github_url,
+        "username": username,
+        "gap_instruction": gap_instruction
+    }
+
+def render_draft(fit_result: Dict[str, Any], competency_map: Dict[str, float], role_summary: str, github_url: str) -> str:
+    """A locally templated letter from the same facts the prompt uses; no LLM call."""
+    skills = _top_skills(competency_map)
+    gap_skill = _gap_skill(fit_result)
+    role = role_summary.strip().rstrip(".") or "this role"
+
+    paragraphs = [
+        "Dear Hiring Manager,",
+        f"I am writing to apply for this internship: {role}."
+    ]
+    if skills:
+        evidence = skills[0] if len(skills) == 1 else f"{', '.join(skills[:-1])} and {skills[-1]}"
+        paragraphs.append(f"My GitHub profile ({github_url}) shows hands-on work with {evidence}.")
+    else:
+        paragraphs.append(f"My GitHub profile ({github_url}) shows the projects I have built.")
+    if gap_skill:
+        paragraphs.append(f"I am currently building up my experience with {gap_skill}, and I pick up new tools quickly.")
+    paragraphs.append("I would welcome the chance to discuss how I can contribute to your team.")
+    paragraphs.append("Sincerely,\nCandidate")
+    return "\n\n".join(paragraphs)
+
+def cached_cover_letter(inputs: Dict[str, str]) -> Optional[str]:
+    """The LLM letter for these prompt inputs if one is cached."""
+    return LETTER_CACHE.get(letter_cache_key(inputs))
+
+def _store(cache_key: str, letter: Optional[str]) -> None:
+    # Failures are not cached, so the next request tries the LLM again.
+    if letter:
+        LETTER_CACHE.set(cache_key, letter)
+
+def generate_cover_letter(fit_result: Dict[str, Any], competency_map: Dict[str, float], role_summary: str, github_url: str) -> str:
+    inputs = prompt_inputs(fit_result, competency_map, role_summary, github_url)
+    return generate_from_inputs(inputs) or FALLBACK_LETTER
+
+def generate_from_inputs(inputs: Dict[str, str]) -> Optional[str]:
+    """The LLM letter for prompt inputs, from the cache when possible; None if the LLM call failed."""
+    cache_key = letter_cache_key(inputs)
+    return LETTER_FLIGHT.do(cache_key, _cached_generate, cache_key, inputs)
+
+def _cached_generate(cache_key: str, inputs: Dict[str, str]) -> Optional[str]:
+    letter = LETTER_CACHE.get(cache_key)
+    if letter is None:
+        letter = _generate(inputs)
+        _store(cache_key, letter)
+    return letter
+
+def _generate(inputs: Dict[str, str]) -> Optional[str]:
     try:
-        llm = ChatGroq(
-            model="llama-3.3-70b-versatile",
-            api_key=os.getenv("GROQ_API_KEY"),
-            temperature=0.3
-        )
-        chain = prompt | llm
-        
-        response = None
-        for attempt in range(3):
-            try:
-                response = chain.invoke({
-                    "role_summary": role_summary,
-                    "top_3_skills": top_3_skills,
-                    "github_url": github_url,
-                    "username": username,
-                    "gap_instruction": gap_instruction
-                })
-                break
-            except Exception as e:
-                if '429' in str(e) and attempt < 2:
-                    time.sleep(15)
-                    continue
-                raise e
-                
-        if response is None:
-            raise Exception("LLM generation failed after retries.")
-            
+        with stage_timer("cover_letter"):
+            response = invoke_with_retry(PROMPT | get_llm(), inputs)
         return response.content.strip()
-        
     except Exception as e:
         print(f"Failed to generate cover letter: {e}")
-        return "Dear Hiring Manager,\n\nI am writing to express my strong interest in this position. Please find my qualifications attached.\n\nSincerely,\nCandidate"
+        return None
+
+async def generate_cover_letter_async(fit_result: Dict[str, Any], competency_map: Dict[str, float], role_summary: str, github_url: str) -> str:
+    """Same as generate_cover_letter, but awaits the LLM instead of blocking the event loop."""
+    inputs = prompt_inputs(fit_result, competency_map, role_summary, github_url)
+    cache_key = letter_cache_key(inputs)
+    letter = await LETTER_FLIGHT.ado(cache_key, lambda: _acached_generate(cache_key, inputs))
+    return letter or FALLBACK_LETTER
+
+async def _astore(cache_key: str, letter: Optional[str]) -> None:
+    if letter:
+        await LETTER_CACHE.aset(cache_key, letter)
+
+async def _acached_generate(cache_key: str, inputs: Dict[str, str]) -> Optional[str]:
+    letter = await LETTER_CACHE.aget(cache_key)
+    if letter is None:
+        letter = await _agenerate(inputs)
+        await _astore(cache_key, letter)
+    return letter
+
+async def _agenerate(inputs: Dict[str, str]) -> Optional[str]:
+    try:
+        with stage_timer("cover_letter"):
+            response = await ainvoke_with_retry(PROMPT | get_llm(), inputs)
+        return response.content.strip()
+    except Exception as e:
+        print(f"Failed to generate cover letter: {e}")
+        return None
+
+def draft_cover_letter(fit_result: Dict[str, Any], competency_map: Dict[str, float], role_summary: str, github_url: str) -> Tuple[str, bool, Dict[str, str]]:
+    """
+    Returns (letter, final, prompt inputs) without waiting on the LLM: the
+    cached LLM letter if there is one (final=True), else the local draft.
+    The caller queues generate_from_inputs(inputs) for the final letter.
+    """
+    inputs = prompt_inputs(fit_result, competency_map, role_summary, github_url)
+    letter = cached_cover_letter(inputs)
+    if letter is not None:
+        return letter, True, inputs
+    return render_draft(fit_result, competency_map, role_summary, github_url), False, inputs
+
+def _streamed_usage(streamed: Any, inputs: Dict[str, str], text: str) -> Any:
+    """
+    The usage Groq reported over a stream (merged from its chunks), or else
+    a count of the prompt and streamed text at ~4 characters per token, in
+    the shape SCHEDULER.settle reads.
+    """
+    if getattr(streamed, "usage_metadata", None):
+        return streamed
+    return SimpleNamespace(usage_metadata={"total_tokens": (len(PROMPT.format(**inputs)) + len(text)) // 4})
+
+async def stream_cover_letter(fit_result: Dict[str, Any], competency_map: Dict[str, float], role_summary: str, github_url: str) -> AsyncIterator[str]:
+    """
+    Yields the cover letter token by token as the LLM streams it, or all at
+    once if it is cached. Rate limits are retried only before the first
+    token; if nothing was produced the fallback letter is yielded instead.
+    A stream that got going settles its token usage with the scheduler, also
+    when the client disconnects partway.
+    """
+    inputs = prompt_inputs(fit_result, competency_map, role_summary, github_url)
+    cache_key = letter_cache_key(inputs)
+    cached = await LETTER_CACHE.aget(cache_key)
+    if cached is not None:
+        yield cached
+        return
+    tokens = estimate_tokens(inputs)
+    ticket = SCHEDULER.ticket()
+    start = time.perf_counter()
+    try:
+        for attempt in range(LLM_MAX_ATTEMPTS):
+            produced = False
+            parts: List[str] = []
+            streamed = None
+            await SCHEDULER.aacquire(tokens, ticket)
+            try:
+                async for chunk in (PROMPT | get_llm()).astream(inputs):
+                    record_llm_usage(chunk)
+                    streamed = chunk if streamed is None else streamed + chunk
+                    token = chunk.content if produced else chunk.content.lstrip()
+                    if token:
+                        produced = True
+                        parts.append(token)
+                        yield token
+                await _astore(cache_key, "".join(parts).strip())
+                return
+            except Exception as e:
+                if not produced and is_rate_limited(e):
+                    on_rate_limited(e, attempt)
+                    if attempt < LLM_MAX_ATTEMPTS - 1:
+                        continue
+                print(f"Failed to stream cover letter: {e}")
+                if not produced:
+                    yield FALLBACK_LETTER
+                return
+            finally:
+                if streamed is not None:
+                    SCHEDULER.settle(tokens, _streamed_usage(streamed, inputs, "".join(parts)))
+    finally:
+        observe_stage("cover_letter_stream", time.perf_counter() - start)
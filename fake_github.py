@@ -0,0 +1,219 @@
+"""
+Local stand-in for the GitHub REST and GraphQL APIs, serving canned profiles
+so ingestion can run offline. Run `python fake_github.py` to ingest a
+synthetic profile through both backends and check they agree.
+"""
+import re
+import os
+import json
+import base64
+import random
+import time
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, Any, List, Optional
+
+# Manifest aliases in a GraphQL query, e.g. `requirements: object(expression: "HEAD:requirements.txt")`
+OBJECT_ALIAS = re.compile(r'(\w+)\s*:\s*object\(expression:\s*"HEAD:([^"]+)"\)')
+
+def synthetic_profile(n_repos: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Builds n_repos fake repositories with a realistic spread of languages and
+    dependency files. Each repo: {name, pushed_at, languages, files}.
+    """
+    rng = random.Random(seed)
+    languages = ["Python", "JavaScript", "TypeScript", "Jupyter Notebook", "HTML", "CSS", "Go", "Rust", "Shell"]
+    packages = ["fastapi", "flask", "numpy", "pandas", "torch", "transformers", "langchain", "pytest",
+                "requests", "Scikit_Learn", "matplotlib", "opencv-python", "streamlit", "boto3", "unknown-pkg"]
+    npm_packages = ["react", "next", "vue", "@angular/core", "tailwindcss", "vite", "express", "jest", "lodash"]
+    repos = []
+    for i in range(n_repos):
+        langs = {lang: rng.randint(500, 200000) for lang in rng.sample(languages, rng.randint(0, 3))}
+        files = {}
+        if rng.random() < 0.6:
+            deps = rng.sample(packages, rng.randint(1, 6))
+            files["requirements.txt"] = "\n".join(f"{dep}=={rng.randint(0, 3)}.{rng.randint(0, 9)}" for dep in deps)
+        if rng.random() < 0.3:
+            deps = rng.sample(npm_packages, rng.randint(1, 4))
+            files["package.json"] = json.dumps({"dependencies": {dep: "^1.0.0" for dep in deps}})
+        if rng.random() < 0.1:
+            files["pyproject.toml"] = '[project]\nname = "demo"\ndependencies = ["langchain-groq>=0.2", "pydantic[email]; python_version>\'3.8\'"]\n'
+        repos.append({
+            "name": f"repo-{i:04d}",
+            "pushed_at": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00Z",
+            "languages": langs,
+            "files": files
+        })
+    return repos
+
+class FakeGitHub:
+    """
+    Threaded HTTP server answering the endpoints the ingestor uses.
+    `profiles` maps a username to its repos (see synthetic_profile).
+    `requests` counts full (200/404) replies, `not_modified` counts 304s.
+    `latency` seconds are added to every reply to mimic a network round-trip.
+    """
+
+    def __init__(self, profiles: Dict[str, List[Dict[str, Any]]], rate_limit: int = 5000, latency: float = 0.0):
+        self.profiles = profiles
+        self.rate_limit = rate_limit
+        self.latency = latency
+        self.remaining = rate_limit
+        self.requests = 0
+        self.not_modified = 0
+        self.graphql_requests = 0
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self) -> str:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like api.github.com, so clients can reuse connections.
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                status, body = fake.rest(url.path, {k: v[0] for k, v in parse_qs(url.query).items()})
+                fake.reply(self, status, body)
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                fake.reply(self, 200, fake.graphql(payload.get("query", ""), payload.get("variables") or {}))
+
+        class Server(ThreadingHTTPServer):
+            # The default backlog of 5 drops connections from a pool of workers.
+            request_queue_size = 128
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self) -> "FakeGitHub":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _repo(self, owner: str, name: str) -> Optional[Dict[str, Any]]:
+        for repo in self.profiles.get(owner, []):
+            if repo["name"] == name:
+                return repo
+        return None
+
+    def rest(self, path: str, query: Dict[str, str]):
+        parts = path.strip("/").split("/")
+        if len(parts) == 3 and parts[0] == "users" and parts[2] == "repos":
+            if parts[1] not in self.profiles:
+                return 404, {"message": "Not Found"}
+            repos = sorted(self.profiles[parts[1]], key=lambda r: r["name"])
+            per_page = int(query.get("per_page", 30))
+            page = int(query.get("page", 1))
+            return 200, [
+                {"name": r["name"], "full_name": f"{parts[1]}/{r['name']}", "pushed_at": r["pushed_at"]}
+                for r in repos[(page - 1) * per_page:page * per_page]
+            ]
+        if len(parts) >= 4 and parts[0] == "repos":
+            repo = self._repo(parts[1], parts[2])
+            if repo is None:
+                return 404, {"message": "Not Found"}
+            if parts[3] == "languages":
+                return 200, repo["languages"]
+            if parts[3] == "contents" and len(parts) == 4:
+                if not repo["files"] and not repo["languages"]:
+                    return 404, {"message": "This repository is empty."}
+                return 200, [{"name": name, "path": name, "type": "file"} for name in sorted(repo["files"])]
+            if parts[3] == "contents":
+                file_path = "/".join(parts[4:])
+                if file_path not in repo["files"]:
+                    return 404, {"message": "Not Found"}
+                content = repo["files"][file_path].encode("utf-8")
+                return 200, {"path": file_path, "encoding": "base64", "content": base64.b64encode(content).decode("ascii")}
+        return 404, {"message": "Not Found"}
+
+    def graphql(self, query: str, variables: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self.graphql_requests += 1
+        login = variables.get("login")
+        if login not in self.profiles:
+            return {"data": {"user": None}, "errors": [{"type": "NOT_FOUND", "message": f"Could not resolve to a User with the login of '{login}'."}]}
+        repos = sorted(self.profiles[login], key=lambda r: r["name"])
+        start = int(variables.get("cursor") or 0)
+        end = start + int(variables.get("first", 50))
+        aliases = OBJECT_ALIAS.findall(query)
+        nodes = []
+        for repo in repos[start:end]:
+            node = {
+                "nameWithOwner": f"{login}/{repo['name']}",
+                "pushedAt": repo["pushed_at"],
+                "isEmpty": not repo["files"] and not repo["languages"],
+                "languages": {"edges": [{"size": size, "node": {"name": name}} for name, size in repo["languages"].items()]}
+            }
+            for alias, file_path in aliases:
+                node[alias] = {"text": repo["files"][file_path]} if file_path in repo["files"] else None
+            nodes.append(node)
+        return {"data": {"user": {"repositories": {
+            "totalCount": len(repos),
+            "pageInfo": {"hasNextPage": end < len(repos), "endCursor": str(end)},
+            "nodes": nodes
+        }}}}
+
+    def reply(self, handler: BaseHTTPRequestHandler, status: int, body: Any) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        payload = json.dumps(body).encode("utf-8")
+        etag = '"%s"' % hashlib.sha1(payload).hexdigest()
+        with self._lock:
+            if status == 200 and handler.headers.get("If-None-Match") == etag:
+                self.not_modified += 1
+                status, payload = 304, b""
+            else:
+                self.requests += 1
+                self.remaining = max(0, self.remaining - 1)
+            remaining = self.remaining
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json; charset=utf-8")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.send_header("ETag", etag)
+        handler.send_header("X-RateLimit-Limit", str(self.rate_limit))
+        handler.send_header("X-RateLimit-Remaining", str(remaining))
+        handler.send_header("X-RateLimit-Reset", "4102444800")
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+def compare_backends(n_repos: int = 120) -> bool:
+    # Keep the comparison out of the real on-disk cache.
+    os.environ.setdefault("FITR_CACHE_DB", "")
+    import github_ingestor
+
+    with FakeGitHub({"octocat": synthetic_profile(n_repos)}) as fake:
+        os.environ["GITHUB_API_URL"] = fake.base_url
+        os.environ.setdefault("GITHUB_TOKEN", "fake-token")
+        maps = {}
+        for backend in ["rest", "graphql"]:
+            github_ingestor.REPO_CACHE.clear()
+            github_ingestor.HTTP_CACHE.clear()
+            github_ingestor.PROFILE_SNAPSHOTS.clear()
+            before = fake.requests
+            maps[backend] = github_ingestor.get_competency_map("https://github.com/octocat", backend=backend)
+            print(f"{backend}: {fake.requests - before} requests -> {maps[backend]}")
+    return maps["rest"] == maps["graphql"]
+
+if __name__ == "__main__":
+    identical = compare_backends()
+    print("Competency maps identical:", identical)
@@ -1,4 +1,11 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from keyword_matcher import AhoCorasick
+from skill_index import resolve_skills
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 ALIASES = {
     "ai/ml": ["python", "ml", "deep-learning", "scikit-learn", "tensorflow", "torch", "nlp"],
@@ -10,49 +17,163 @@ ALIASES = {
     "python": ["python", "Python"]
 }
 
+# Lowercased alias terms per JD skill, and one automaton over all of them so a
+# competency map is scanned for every alias term in a single pass.
+_ALIAS_TERMS = {skill: [term.lower() for term in terms] for skill, terms in ALIASES.items()}
+_ALIAS_AUTOMATON = AhoCorasick(term for terms in _ALIAS_TERMS.values() for term in terms)
+
+class SkillMatcher:
+    """
+    Precompiled matcher for one competency map: keys are lowercased and
+    scanned for alias terms once, after which each JD skill resolves with a
+    set lookup plus one substring check, falling back to the competency keys
+    implied by its nearest term in the skill index. Build one per candidate
+    and reuse it across every JD they are scored against.
+    """
+
+    def __init__(self, competency_map: Dict[str, Any]):
+        keys = [comp_skill.lower() for comp_skill, score in competency_map.items() if score > 0.1]
+        self._keys = set(keys)
+        # NUL never appears in skill names, so no match can span two keys.
+        self._haystack = "\0".join(keys) if keys else None
+        self._alias_hits = _ALIAS_AUTOMATON.find(self._haystack) if keys else set()
+        self._resolved: Dict[str, bool] = {}
+        self._implied: Dict[str, Tuple[str, ...]] = {}
+
+    def prepare(self, skills: Iterable[str]) -> None:
+        """Looks up every skill not seen yet in the skill index with one batched query."""
+        new = [skill for skill in skills if skill.lower() not in self._implied]
+        if new and self._haystack is not None:
+            self._implied.update(resolve_skills(new))
+
+    def matches(self, skill: str) -> bool:
+        """Fuzzy match against explicit aliases, partial lowercase string match or the skill index."""
+        if self._haystack is None:
+            return False
+        skill_lower = skill.lower()
+        hit = self._resolved.get(skill_lower)
+        if hit is None:
+            terms = _ALIAS_TERMS.get(skill_lower, ())
+            hit = skill_lower in self._haystack or any(term in self._alias_hits for term in terms)
+            if not hit:
+                self.prepare([skill_lower])
+                hit = any(key in self._keys for key in self._implied.get(skill_lower, ()))
+            self._resolved[skill_lower] = hit
+        return hit
+
 def matches(skill: str, competency_map: Dict[str, float]) -> bool:
     """Fuzzy match against explicit aliases or partial lowercase string match."""
-    skill_lower = skill.lower()
-    
-    # Get all variations to look for (itself + any aliases)
-    search_terms = ALIASES.get(skill_lower, [skill_lower])
-    if skill_lower not in search_terms:
-        search_terms.append(skill_lower)
-        
-    for term in search_terms:
-        for comp_skill, score in competency_map.items():
-            if term in comp_skill.lower() and score > 0.1:
-                return True
-                
-    return False
-
-def calculate_fit(competency_map: Dict[str, Any], jd_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    return SkillMatcher(competency_map).matches(skill)
+
+def recommend(fit_score: int) -> str:
+    if fit_score >= 70:
+        return "YES — Apply with confidence"
+    elif fit_score >= 50:
+        return "BORDERLINE — Address the gaps in cover letter"
+    else:
+        return "NO — Skill gap too large or suspicious posting"
+
+def calculate_fit(competency_map: Dict[str, Any], jd_analysis: Dict[str, Any], matcher: Optional[SkillMatcher] = None) -> Dict[str, Any]:
     hard_skills: List[str] = jd_analysis.get('hard_skills', [])
     quick_learn_skills: List[str] = jd_analysis.get('quick_learn_skills', [])
     legitimacy_score: int = jd_analysis.get('legitimacy_score', 0)
-    
-    hard_matched = [s for s in hard_skills if matches(s, competency_map)]
-    
-    hard_missing = [s for s in hard_skills if not matches(s, competency_map)]
-    quick_learn_missing = [s for s in quick_learn_skills if not matches(s, competency_map)]
+    matcher = matcher or SkillMatcher(competency_map)
+    matcher.prepare(hard_skills + quick_learn_skills)
+
+    hard_matched = []
+    hard_missing = []
+    for s in hard_skills:
+        (hard_matched if matcher.matches(s) else hard_missing).append(s)
+    quick_learn_missing = [s for s in quick_learn_skills if not matcher.matches(s)]
 
     hard_score = (len(hard_matched) / max(len(hard_skills), 1)) * 85
     legit_score = legitimacy_score * 0.15
 
     fit_score = round(hard_score + legit_score)
-    
-    if fit_score >= 70:
-        recommendation = "YES — Apply with confidence"
-    elif fit_score >= 50:
-        recommendation = "BORDERLINE — Address the gaps in cover letter"
-    else:
-        recommendation = "NO — Skill gap too large or suspicious posting"
         
     return {
         "fit_score": fit_score,
         "hard_matched": hard_matched,
         "hard_missing": hard_missing,
         "quick_learn_missing": quick_learn_missing,
-        "recommendation": recommendation,
+        "recommendation": recommend(fit_score),
         "legitimacy_score": legitimacy_score
     }
+
+def calculate_fit_batch(competency_maps: List[Dict[str, Any]], jd_analyses: List[Dict[str, Any]], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Scores every (competency map, JD) pair, typically one candidate against
+    many postings or many candidates against one posting. Returns calculate_fit
+    results tagged with candidate_index / jd_index, best fit first.
+    Each distinct skill is resolved once per candidate into a skill-by-candidate
+    matrix; each JD's hard-skill hits are then summed over its own columns in
+    one segmented reduction, so memory grows with the number of JD skills
+    rather than JDs x vocabulary.
+    """
+    matchers = [SkillMatcher(competency_map) for competency_map in competency_maps]
+    n_candidates = len(matchers)
+
+    if np is None:
+        results = [
+            dict(calculate_fit(competency_map, jd, matcher), candidate_index=c, jd_index=j)
+            for j, jd in enumerate(jd_analyses)
+            for c, (competency_map, matcher) in enumerate(zip(competency_maps, matchers))
+        ]
+        results.sort(key=lambda r: r["fit_score"], reverse=True)
+        return results[:top_k] if top_k is not None else results
+
+    # Column index of every distinct (lowercased) JD skill.
+    vocab: Dict[str, int] = {}
+    jd_columns = []
+    cols = []
+    for jd in jd_analyses:
+        hard = [vocab.setdefault(s.lower(), len(vocab)) for s in jd.get('hard_skills', [])]
+        quick = [vocab.setdefault(s.lower(), len(vocab)) for s in jd.get('quick_learn_skills', [])]
+        jd_columns.append((hard, quick))
+        cols.extend(hard)
+
+    # The first prepare queries the index; the rest hit its resolved-skill cache.
+    hit_matrix = np.empty((len(vocab), n_candidates), dtype=bool)
+    for c, matcher in enumerate(matchers):
+        matcher.prepare(vocab)
+        hit_matrix[:, c] = np.fromiter((matcher.matches(skill) for skill in vocab), dtype=bool, count=len(vocab))
+
+    # Hard-skill hits per (JD, candidate): the JDs' hard-skill columns laid end
+    # to end, summed per JD. reduceat can't express an empty segment, so it
+    # runs over the JDs that have hard skills and the rest stay zero.
+    hard_counts = np.array([len(hard) for hard, _ in jd_columns], dtype=np.intp)
+    hard_hits = np.zeros((len(jd_analyses), n_candidates), dtype=np.int64)
+    has_hard = hard_counts > 0
+    if has_hard.any():
+        offsets = (np.cumsum(hard_counts) - hard_counts)[has_hard]
+        hard_hits[has_hard] = np.add.reduceat(hit_matrix[np.array(cols, dtype=np.intp)], offsets, axis=0, dtype=np.int64)
+
+    n_hard = np.maximum(hard_counts.astype(np.float64), 1)
+    legitimacy = np.array([jd.get('legitimacy_score', 0) for jd in jd_analyses], dtype=np.float64)
+    # Same operation order as calculate_fit, so scores round identically.
+    scores = np.rint(hard_hits / n_hard[:, None] * 85 + legitimacy[:, None] * 0.15).astype(int)
+
+    flat_scores = scores.ravel()
+    order = np.argsort(-flat_scores, kind="stable")
+    if top_k is not None:
+        order = order[:top_k]
+
+    results = []
+    for flat in order.tolist():
+        j, c = divmod(flat, n_candidates)
+        jd = jd_analyses[j]
+        hard, quick = jd_columns[j]
+        hard_skills = jd.get('hard_skills', [])
+        hits = hit_matrix[:, c]
+        fit_score = int(flat_scores[flat])
+        results.append({
+            "fit_score": fit_score,
+            "hard_matched": [s for s, col in zip(hard_skills, hard) if hits[col]],
+            "hard_missing": [s for s, col in zip(hard_skills, hard) if not hits[col]],
+            "quick_learn_missing": [s for s, col in zip(jd.get('quick_learn_skills', []), quick) if not hits[col]],
+            "recommendation": recommend(fit_score),
+            "legitimacy_score": jd.get('legitimacy_score', 0),
+            "candidate_index": c,
+            "jd_index": j
+        })
+    return results
@@ -1,7 +1,102 @@
 import os
 import re
-from typing import Dict, Any, List, Tuple, Set, Iterable
-from github import Github, GithubException
+import copy
+import json
+import time
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple, Set, Iterable
+from github import Github, GithubException, RateLimitExceededException
+from cache import TTLCache, open_backend
+from clients import CLIENTS
+from singleflight import SingleFlight
+from metrics import GITHUB_ERRORS, stage_timer
+from manifest_scanner import MANIFEST_FILES, normalize_package_name, parse_manifest
+
+# Upper bound on concurrent per-repo API calls during ingestion.
+GITHUB_MAX_WORKERS = int(os.getenv("GITHUB_MAX_WORKERS", "8"))
+
+# Per-repo ingestion results, keyed by full_name and versioned by pushed_at so
+# only repos that received a push since the last ingest are fetched again.
+REPO_CACHE = TTLCache(
+    "github_repo_v2",
+    max_entries=int(os.getenv("GITHUB_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("GITHUB_CACHE_TTL", "86400"))
+)
+
+# ETag / Last-Modified validators and bodies per REST endpoint. A 304 reply to
+# a conditional request is served from here and costs no rate-limit quota.
+HTTP_CACHE = TTLCache(
+    "github_http",
+    max_entries=int(os.getenv("GITHUB_CACHE_SIZE", "5000")) * 3,
+    ttl=float(os.getenv("GITHUB_HTTP_CACHE_TTL", "604800"))
+)
+
+# Per-user snapshot of the last full ingest: every repo's pushed_at and
+# contribution, plus the running language / skill totals. While it is younger
+# than GITHUB_SNAPSHOT_TTL, re-ingesting the user only fetches repos that are
+# new or pushed to since, and drops repos no longer listed (deleted, renamed
+# or made private).
+GITHUB_SNAPSHOT_TTL = float(os.getenv("GITHUB_SNAPSHOT_TTL", "604800"))
+PROFILE_SNAPSHOTS = TTLCache(
+    "github_profile",
+    max_entries=int(os.getenv("GITHUB_SNAPSHOT_SIZE", "1000")),
+    ttl=GITHUB_SNAPSHOT_TTL
+)
+
+# Identical ingests already in flight (same user and backend) are joined
+# rather than crawled again, by any worker process sharing the cache backend.
+INGEST_FLIGHT = SingleFlight("ingest", open_backend())
+
+# Background ingests report progress (and a partial map) every this many repos.
+PROGRESS_EVERY = int(os.getenv("GITHUB_PROGRESS_EVERY", "25"))
+
+# progress(done, total, per-repo results so far)
+RepoProgress = Callable[[int, int, List[Tuple[Dict[str, int], Set[str], bool]]], None]
+
+# Once fewer than this many requests remain, calls are paced out over the time
+# left until the rate-limit window resets instead of running into 403s. The
+# reserve is capped at a tenth of the reported limit, so an unauthenticated
+# client (60 per hour) isn't paced from its first call.
+GITHUB_RATE_RESERVE = int(os.getenv("GITHUB_RATE_RESERVE", "100"))
+GITHUB_MAX_THROTTLE_SLEEP = float(os.getenv("GITHUB_MAX_THROTTLE_SLEEP", "5"))
+
+# Last rate-limit budget reported by GitHub per resource ("core" for REST,
+# "graphql" for the GraphQL API, which has its own points budget), shared by
+# every client instance.
+RATE_LIMIT = {
+    "core": {"remaining": -1, "limit": -1, "reset": 0},
+    "graphql": {"remaining": -1, "limit": -1, "reset": 0}
+}
+
+# Ingestion backend: "rest" (per-repo calls) or "graphql" (bulk paginated
+# queries, needs a token). Overridable per request.
+GITHUB_BACKEND = os.getenv("GITHUB_BACKEND", "rest")
+GRAPHQL_PAGE_SIZE = int(os.getenv("GITHUB_GRAPHQL_PAGE_SIZE", "50"))
+
+# GraphQL alias for each manifest blob, e.g. package.json -> package_json
+MANIFEST_ALIASES = {name: re.sub(r"\W", "_", name) for name in MANIFEST_FILES}
+
+REPOS_QUERY = """
+query($login: String!, $first: Int!, $cursor: String) {
+  user(login: $login) {
+    repositories(first: $first, after: $cursor, privacy: PUBLIC, ownerAffiliations: OWNER, orderBy: {field: NAME, direction: ASC}) {
+      totalCount
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        nameWithOwner
+        pushedAt
+        isEmpty
+        languages(first: 100) { edges { size node { name } } }
+%s
+      }
+    }
+  }
+}
+""" % "\n".join(
+    f'        {alias}: object(expression: "HEAD:{name}") {{ ... on Blob {{ text }} }}'
+    for name, alias in MANIFEST_ALIASES.items()
+)
 
 PACKAGE_SKILL_MAP = {
     # Backend
@@ -110,54 +205,297 @@ PACKAGE_SKILL_MAP = {
     'pytest': 'testing', 'unittest': 'testing',
     'hypothesis': 'testing', 'faker': 'testing',
     'coverage': 'testing', 'tox': 'testing',
+
+    # Conda / Node / Go / Rust ecosystems
+    'pytorch': 'deep-learning',
+    'express': 'backend', 'nestjs': 'backend', 'koa': 'backend',
+    'gin': 'backend', 'fiber': 'backend', 'gorm': 'backend',
+    'actix-web': 'backend', 'axum': 'backend', 'rocket': 'backend',
+    'tokio': 'backend', 'diesel': 'backend',
+    'client-go': 'devops', 'tch': 'deep-learning', 'candle-core': 'deep-learning',
+    'jest': 'testing', 'vitest': 'testing', 'cypress': 'testing',
 }
 
+# PACKAGE_SKILL_MAP keyed by normalized name, so Scikit_Learn, scikit.learn
+# and scikit-learn all resolve with one dict lookup.
+PACKAGE_INDEX = {normalize_package_name(name): skill for name, skill in PACKAGE_SKILL_MAP.items()}
+
 def extract_username(url: str) -> str:
     url = url.rstrip('/')
     return url.split('/')[-1]
 
 def authenticate_github(github_url: str) -> Github:
-    username = extract_username(github_url)
-    token = os.getenv("GITHUB_TOKEN")
-    if not token:
-        print("Warning: GITHUB_TOKEN not found in environment.")
-        return Github()
-    else:
-        return Github(token)
-
-def get_repos(g: Github, username: str) -> Any:
-    user = g.get_user(username)
-    return user.get_repos()
-
-def extract_language_info(repos: Any) -> Tuple[Dict[str, int], Dict[str, int], Set[str], int]:
+    """The application-wide GitHub client; its pooled session is shared by every ingest."""
+    return CLIENTS.github()
+
+def rate_limit_status() -> Dict[str, Dict[str, int]]:
+    return {resource: dict(budget) for resource, budget in RATE_LIMIT.items()}
+
+def _rate_reserve(limit: int) -> int:
+    return min(GITHUB_RATE_RESERVE, limit // 10) if limit > 0 else GITHUB_RATE_RESERVE
+
+def _throttle(resource: str = "core") -> None:
+    budget = RATE_LIMIT[resource]
+    remaining, reset = budget["remaining"], budget["reset"]
+    if remaining < 0 or remaining > _rate_reserve(budget["limit"]):
+        return
+    wait = reset - time.time()
+    if wait <= 0:
+        return
+    if remaining == 0:
+        raise RateLimitExceededException(403, {"message": f"API rate limit exceeded, resets in {int(wait)}s"}, None)
+    time.sleep(min(wait / remaining, GITHUB_MAX_THROTTLE_SLEEP))
+
+def _record_rate_limit(response_headers: Dict[str, Any], resource: str = "core") -> None:
+    if "x-ratelimit-remaining" in response_headers:
+        budget = RATE_LIMIT[resource]
+        budget["remaining"] = int(float(response_headers["x-ratelimit-remaining"]))
+        budget["limit"] = int(float(response_headers.get("x-ratelimit-limit", -1)))
+        budget["reset"] = int(float(response_headers.get("x-ratelimit-reset", 0)))
+
+def conditional_get(g: Github, url: str, parameters: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    GET a REST endpoint, sending the stored ETag / Last-Modified validators.
+    A 304 returns the stored body; other errors raise GithubException.
+    """
+    key = url + (json.dumps(parameters, sort_keys=True) if parameters else "")
+    stored = HTTP_CACHE.get(key)
+    headers = {}
+    if stored is not None:
+        if stored.get("etag"):
+            headers["If-None-Match"] = stored["etag"]
+        if stored.get("last_modified"):
+            headers["If-Modified-Since"] = stored["last_modified"]
+
+    _throttle()
+    status, response_headers, output = g.requester.requestJson("GET", url, parameters=parameters, headers=headers)
+    _record_rate_limit(response_headers)
+
+    if status == 304 and stored is not None:
+        return stored["body"]
+    data = json.loads(output) if output else None
+    if status >= 400:
+        GITHUB_ERRORS.inc(status=status)
+        raise g.requester.createException(status, response_headers, data)
+
+    if "etag" in response_headers or "last-modified" in response_headers:
+        HTTP_CACHE.set(key, {
+            "etag": response_headers.get("etag"),
+            "last_modified": response_headers.get("last-modified"),
+            "body": data
+        })
+    return data
+
+def get_repos(g: Github, username: str) -> List[Dict[str, Any]]:
+    repos = []
+    page = 1
+    while True:
+        with stage_timer("github_list_repos"):
+            batch = conditional_get(g, f"/users/{username}/repos", {"per_page": 100, "page": page})
+        repos.extend(batch)
+        if len(batch) < 100:
+            return repos
+        page += 1
+
+def manifest_skills(filename: str, content: str) -> Set[str]:
+    return {PACKAGE_INDEX[name] for name in parse_manifest(filename, content) if name in PACKAGE_INDEX}
+
+def fetch_repo_info(g: Github, repo: Dict[str, Any]) -> Tuple[Dict[str, int], Set[str], bool]:
+    """
+    Fetches one repo's language bytes and the skills implied by the dependency
+    manifests in its root. The flag is False when GitHub answered 403/404 (e.g.
+    an empty repo); languages read before the failure are still returned.
+    Results are served from REPO_CACHE while the repo's pushed_at is unchanged.
+    Rate-limit 403s are raised rather than counted as a failed repo.
+    """
+    full_name = repo["full_name"]
+    version = repo.get("pushed_at") or ""
+    cached = REPO_CACHE.get(full_name, version=version)
+    if cached is not None:
+        return cached["languages"], set(cached["package_skills"]), cached["fetched"]
+
+    langs: Dict[str, int] = {}
+    package_skills: Set[str] = set()
+    fetched = True
+    try:
+        with stage_timer("github_repo_languages"):
+            langs = conditional_get(g, f"/repos/{full_name}/languages")
+        with stage_timer("github_repo_manifests"):
+            root = conditional_get(g, f"/repos/{full_name}/contents")
+            present = {entry["name"] for entry in root if entry.get("type") == "file"}
+            for name in MANIFEST_FILES:
+                if name not in present:
+                    continue
+                manifest = conditional_get(g, f"/repos/{full_name}/contents/{name}")
+                if manifest.get("encoding") == "base64":
+                    content = base64.b64decode(manifest["content"]).decode('utf-8', errors='replace')
+                    package_skills |= manifest_skills(name, content)
+    except RateLimitExceededException:
+        raise
+    except GithubException as e:
+        if e.status not in [403, 404]:
+            raise e
+        fetched = False
+        if e.status == 403:
+            return langs, package_skills, fetched
+
+    REPO_CACHE.set(full_name, {
+        "languages": langs,
+        "package_skills": sorted(package_skills),
+        "fetched": fetched
+    }, version=version)
+    return langs, package_skills, fetched
+
+def cache_stats() -> Dict[str, Any]:
+    return {"repos": REPO_CACHE.stats(), "http": HTTP_CACHE.stats()}
+
+def coalescing_stats() -> Dict[str, Any]:
+    return INGEST_FLIGHT.stats()
+
+def _merge_repo_results(results: Iterable[Tuple[Dict[str, int], Set[str], bool]]) -> Tuple[Dict[str, int], Dict[str, int], Set[str], int]:
     language_bytes = {}
     language_repos = {}
     package_skills = set()
     total_repos = 0
-    for repo in repos:
-        try:
+    for langs, skills, fetched in results:
+        for lang, b in langs.items():
+            language_bytes[lang] = language_bytes.get(lang, 0) + b
+            language_repos[lang] = language_repos.get(lang, 0) + 1
+        package_skills.update(skills)
+        if fetched:
             total_repos += 1
-            langs = repo.get_languages()
-            for lang, b in langs.items():
-                language_bytes[lang] = language_bytes.get(lang, 0) + b
-                language_repos[lang] = language_repos.get(lang, 0) + 1
-
-            req_file = repo.get_contents("requirements.txt")
-            if not isinstance(req_file, list):
-                content = req_file.decoded_content.decode('utf-8')
-                for line in content.splitlines():
-                    pkg_match = re.split(r'==|>=|<=|>|<|~=|\s|;', line.strip())
-                    if pkg_match:
-                        pkg_name = pkg_match[0].lower()
-                        if pkg_name in PACKAGE_SKILL_MAP:
-                            package_skills.add(PACKAGE_SKILL_MAP[pkg_name])
-        except GithubException as e:
-            if e.status in [403, 404]:
-                total_repos -= 1 # adjust if we failed to fetch
-                continue
-            raise e
     return language_bytes, language_repos, package_skills, total_repos
 
+def fetch_repo_infos(g: Github, repos: List[Dict[str, Any]], max_workers: Optional[int] = None, progress: Optional[RepoProgress] = None) -> List[Tuple[Dict[str, int], Set[str], bool]]:
+    # pool.map yields in repo order, so the merged dicts keep the same
+    # insertion order (and score tie-breaks) as a serial walk.
+    if not repos:
+        return []
+    pool = ThreadPoolExecutor(max_workers=max_workers or GITHUB_MAX_WORKERS)
+    try:
+        results = []
+        for result in pool.map(lambda repo: fetch_repo_info(g, repo), repos):
+            results.append(result)
+            if progress and (len(results) % PROGRESS_EVERY == 0 or len(results) == len(repos)):
+                progress(len(results), len(repos), results)
+        return results
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def extract_language_info(g: Github, repos: Iterable[Dict[str, Any]], max_workers: Optional[int] = None, progress: Optional[RepoProgress] = None) -> Tuple[Dict[str, int], Dict[str, int], Set[str], int]:
+    return _merge_repo_results(fetch_repo_infos(g, list(repos), max_workers, progress))
+
+def _graphql_repo_info(node: Dict[str, Any]) -> Tuple[Dict[str, int], Set[str], bool]:
+    """
+    Converts one GraphQL repository node into the same (languages, skills,
+    fetched) triple fetch_repo_info produces; an empty repo counts as not
+    fetched, like the REST 404 on its contents does.
+    """
+    langs = {edge["node"]["name"]: edge["size"] for edge in node["languages"]["edges"]}
+    package_skills = set()
+    for name, alias in MANIFEST_ALIASES.items():
+        blob = node.get(alias)
+        if blob and blob.get("text"):
+            package_skills |= manifest_skills(name, blob["text"])
+    fetched = not node.get("isEmpty")
+
+    REPO_CACHE.set(node["nameWithOwner"], {
+        "languages": langs,
+        "package_skills": sorted(package_skills),
+        "fetched": fetched
+    }, version=node.get("pushedAt") or "")
+    return langs, package_skills, fetched
+
+def extract_language_info_graphql(g: Github, username: str, progress: Optional[RepoProgress] = None) -> Tuple[Dict[str, int], Dict[str, int], Set[str], int]:
+    _, results = fetch_repo_infos_graphql(g, username, progress)
+    return _merge_repo_results(results)
+
+def fetch_repo_infos_graphql(g: Github, username: str, progress: Optional[RepoProgress] = None) -> Tuple[List[Dict[str, Any]], List[Tuple[Dict[str, int], Set[str], bool]]]:
+    """
+    Bulk ingestion path: repo list, language byte sizes and manifest blob
+    text in one paginated GraphQL query, instead of 2+ REST calls per repo.
+    Returns the repos (as {full_name, pushed_at}) and their results.
+    """
+    repos = []
+    results = []
+    cursor = None
+    while True:
+        _throttle("graphql")
+        with stage_timer("github_graphql_page"):
+            response_headers, data = g.requester.graphql_query(
+                REPOS_QUERY, {"login": username, "first": GRAPHQL_PAGE_SIZE, "cursor": cursor}
+            )
+        _record_rate_limit(response_headers, "graphql")
+        repositories = data["data"]["user"]["repositories"]
+        for node in repositories["nodes"]:
+            repos.append({"full_name": node["nameWithOwner"], "pushed_at": node.get("pushedAt")})
+            results.append(_graphql_repo_info(node))
+        if progress:
+            progress(len(results), repositories.get("totalCount", len(results)), results)
+        if not repositories["pageInfo"]["hasNextPage"]:
+            return repos, results
+        cursor = repositories["pageInfo"]["endCursor"]
+
+def get_changed_repos(g: Github, username: str, snapshot: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Set[str]]:
+    """
+    Lists the user's repos and returns (repos the snapshot doesn't have at
+    the same pushed_at, full names of every listed repo). The listing is the
+    same conditional request a full crawl makes, so an unchanged page costs
+    a 304; repos renamed or made public since show up as new even though
+    their pushed_at is old.
+    """
+    repos = get_repos(g, username)
+    changed = []
+    for repo in repos:
+        known = snapshot["repos"].get(repo["full_name"])
+        if known is None or known["pushed_at"] != (repo.get("pushed_at") or ""):
+            changed.append(repo)
+    return changed, {repo["full_name"] for repo in repos}
+
+def _new_snapshot() -> Dict[str, Any]:
+    return {"crawled_at": time.time(), "repos": {}, "language_bytes": {}, "language_repos": {}, "package_skills": {}, "total_repos": 0}
+
+def _apply_repo(snapshot: Dict[str, Any], entry: Dict[str, Any], sign: int) -> None:
+    """Adds (sign=1) or removes (sign=-1) one repo's contribution to the snapshot totals."""
+    language_bytes, language_repos = snapshot["language_bytes"], snapshot["language_repos"]
+    for lang, b in entry["languages"].items():
+        repos = language_repos.get(lang, 0) + sign
+        if repos:
+            language_repos[lang] = repos
+            language_bytes[lang] = language_bytes.get(lang, 0) + sign * b
+        else:
+            language_repos.pop(lang, None)
+            language_bytes.pop(lang, None)
+    # Skill -> number of repos using it, so a skill survives until its last repo drops it.
+    skill_repos = snapshot["package_skills"]
+    for skill in entry["package_skills"]:
+        count = skill_repos.get(skill, 0) + sign
+        if count:
+            skill_repos[skill] = count
+        else:
+            skill_repos.pop(skill, None)
+    if entry["fetched"]:
+        snapshot["total_repos"] += sign
+
+def _update_snapshot(snapshot: Dict[str, Any], repos: List[Dict[str, Any]], results: List[Tuple[Dict[str, int], Set[str], bool]]) -> None:
+    for repo, (langs, skills, fetched) in zip(repos, results):
+        old = snapshot["repos"].get(repo["full_name"])
+        if old is not None:
+            _apply_repo(snapshot, old, -1)
+        entry = {"pushed_at": repo.get("pushed_at") or "", "languages": langs, "package_skills": sorted(skills), "fetched": fetched}
+        snapshot["repos"][repo["full_name"]] = entry
+        _apply_repo(snapshot, entry, 1)
+
+def _drop_missing_repos(snapshot: Dict[str, Any], listed: Set[str]) -> int:
+    """Removes repos no longer listed (deleted, renamed or made private); returns how many."""
+    missing = [name for name in snapshot["repos"] if name not in listed]
+    for name in missing:
+        _apply_repo(snapshot, snapshot["repos"].pop(name), -1)
+    return len(missing)
+
+def _snapshot_info(snapshot: Dict[str, Any]) -> Tuple[Dict[str, int], Dict[str, int], Set[str], int]:
+    return dict(snapshot["language_bytes"]), dict(snapshot["language_repos"]), set(snapshot["package_skills"]), snapshot["total_repos"]
+
 def calculate_language_scores(language_bytes: Dict[str, int], language_repos: Dict[str, int], total_repos: int, total_bytes: int, package_skills: Set[str]) -> Dict[str, float]:
     final_scores = {}
     if total_repos > 0 and total_bytes > 0:
@@ -171,14 +509,82 @@ def calculate_language_scores(language_bytes: Dict[str, int], language_repos: Di
         final_scores[skill] = 1.0
     return dict(sorted(final_scores.items(), key=lambda item: item[1], reverse=True))
 
-def get_competency_map(github_url: str) -> Dict[str, float]:
+def get_competency_map(github_url: str, max_workers: Optional[int] = None, backend: Optional[str] = None, progress: Optional[Callable[[int, int, Dict[str, float]], None]] = None) -> Dict[str, float]:
+    """
+    Builds the competency map for a GitHub profile. Concurrent calls for the
+    same user and backend share one crawl (and only the first caller's
+    progress callback is called). progress(done, total, partial_map) is
+    called every PROGRESS_EVERY repos with the map built from them so far.
+    A user crawled within GITHUB_SNAPSHOT_TTL is refreshed from their
+    snapshot instead: only repos pushed to since then are fetched.
+    """
+    key = f"{extract_username(github_url).lower()}\0{backend or GITHUB_BACKEND}"
+    with stage_timer("github_ingest"):
+        return INGEST_FLIGHT.do(key, _build_competency_map, github_url, max_workers, backend, progress)
+
+def _snapshot_map(snapshot: Dict[str, Any]) -> Dict[str, float]:
+    language_bytes, language_repos, package_skills, total_repos = _snapshot_info(snapshot)
+    total_bytes = sum(language_bytes.values()) if language_bytes else 0
+    return calculate_language_scores(language_bytes, language_repos, total_repos, total_bytes, package_skills)
+
+def _refresh_reporter(progress: Callable[[int, int, Dict[str, float]], None], snapshot: Dict[str, Any], changed: List[Dict[str, Any]]) -> RepoProgress:
+    """Partial maps during a refresh: the snapshot with the changed repos fetched so far applied."""
+    def report(done: int, total: int, results: List[Tuple[Dict[str, int], Set[str], bool]]) -> None:
+        partial = copy.deepcopy(snapshot)
+        _update_snapshot(partial, changed[:done], results)
+        progress(done, total, _snapshot_map(partial))
+    return report
+
+def _partial_map_reporter(progress: Callable[[int, int, Dict[str, float]], None]) -> RepoProgress:
+    def report(done: int, total: int, results: List[Tuple[Dict[str, int], Set[str], bool]]) -> None:
+        language_bytes, language_repos, package_skills, total_repos = _merge_repo_results(results)
+        total_bytes = sum(language_bytes.values()) if language_bytes else 0
+        progress(done, total, calculate_language_scores(language_bytes, language_repos, total_repos, total_bytes, package_skills))
+    return report
+
+def _build_competency_map(github_url: str, max_workers: Optional[int], backend: Optional[str], progress: Optional[Callable[[int, int, Dict[str, float]], None]] = None) -> Dict[str, float]:
     g = authenticate_github(github_url)
     username = extract_username(github_url)
+    backend = backend or GITHUB_BACKEND
+    report = _partial_map_reporter(progress) if progress else None
+    snapshot_key = username.lower()
     try:
-        repos = get_repos(g, username)
-        language_bytes, language_repos, package_skills, total_repos = extract_language_info(repos)
-        total_bytes = sum(language_bytes.values()) if language_bytes else 0
-        return calculate_language_scores(language_bytes, language_repos, total_repos, total_bytes, package_skills)
+        snapshot = PROFILE_SNAPSHOTS.get(snapshot_key)
+        refreshed = snapshot is not None and time.time() - snapshot["crawled_at"] < GITHUB_SNAPSHOT_TTL
+        if refreshed:
+            # Refresh: only repos pushed to since the last crawl cost API calls.
+            snapshot = copy.deepcopy(snapshot)
+            changed, listed = get_changed_repos(g, username, snapshot)
+            dropped = _drop_missing_repos(snapshot, listed)
+            refresh_report = None
+            if progress:
+                progress(0, len(changed), _snapshot_map(snapshot))
+                refresh_report = _refresh_reporter(progress, snapshot, changed)
+            _update_snapshot(snapshot, changed, fetch_repo_infos(g, changed, max_workers, refresh_report))
+        else:
+            results = None
+            if backend == "graphql":
+                if os.getenv("GITHUB_TOKEN"):
+                    try:
+                        repos, results = fetch_repo_infos_graphql(g, username, report)
+                    except RateLimitExceededException:
+                        raise
+                    except Exception as e:
+                        print(f"GraphQL ingestion failed, falling back to REST: {e}")
+                else:
+                    print("Warning: GraphQL ingestion needs GITHUB_TOKEN, falling back to REST.")
+            if results is None:
+                repos = get_repos(g, username)
+                results = fetch_repo_infos(g, repos, max_workers, report)
+            changed, dropped = repos, 0
+            snapshot = _new_snapshot()
+            _update_snapshot(snapshot, repos, results)
+        if changed or dropped:
+            PROFILE_SNAPSHOTS.set(snapshot_key, snapshot)
+        return _snapshot_map(snapshot)
+    except RateLimitExceededException as e:
+        print(f"GitHub rate limit hit: {e}")
+        return {"error": f"GitHub rate limit exceeded while fetching {username}, try again later"}
     except GithubException as e:
         print(f"GitHub API Error: {e}")
         return {"error": f"Failed to fetch data for {username}"}
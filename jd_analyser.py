@@ -1,67 +1,173 @@
 import json
-import time
 import os
-from langchain_groq import ChatGroq
+import asyncio
+import hashlib
+from typing import Any, List, Optional, Tuple
 from langchain_core.prompts import PromptTemplate
+from cache import TTLCache, open_backend
+from keyword_matcher import AhoCorasick
+from singleflight import SingleFlight
+from metrics import stage_timer
+from jd_rules import extract_jd_rules
+from clients import MODEL_NAME
+from llm_client import get_llm, invoke_with_retry, ainvoke_with_retry, is_rate_limited
 
-def analyse_jd(jd_text: str) -> dict:
-    jd_text = jd_text.strip()
-    jd_text = jd_text.replace('\r\n', ' ')
-    jd_text = jd_text.replace('\n', ' ')
-    jd_text = jd_text.replace('\t', ' ')
-    prompt_template = """You are a hiring manager. Analyse this job description and return ONLY valid JSON with these keys:
+# "llm" asks Groq; "fast" uses the offline rule-based extractor in jd_rules.
+# LLM mode falls back to the rules when Groq stays rate-limited.
+JD_ANALYSIS_MODES = ("llm", "fast")
+JD_ANALYSIS_MODE = os.getenv("JD_ANALYSIS_MODE", "llm")
+
+# Bump whenever the prompt changes so analyses cached for the old prompt are not reused.
+PROMPT_VERSION = "1"
+
+PROMPT = PromptTemplate.from_template("""You are a hiring manager. Analyse this job description and return ONLY valid JSON with these keys:
 - hard_skills: list of must-have skills (strings)
 - quick_learn_skills: list of skills from the above requirements that a candidate could realistically learn the basics of in under 2 weeks (e.g., a specific library, a straightforward API, or basic tool, rather than an entire paradigm or language).
 - role_summary: one sentence description
 - stipend: extracted stipend or 'not mentioned'
 
 Job Description: {jd_text}
-"""
+""")
+
+BATCH_PROMPT = PromptTemplate.from_template("""You are a hiring manager. Analyse each of the numbered job descriptions below and return ONLY a valid JSON array with one object per job description, in the same order. Each object has these keys:
+- id: the job description's number
+- hard_skills: list of must-have skills (strings)
+- quick_learn_skills: list of skills from the above requirements that a candidate could realistically learn the basics of in under 2 weeks (e.g., a specific library, a straightforward API, or basic tool, rather than an entire paradigm or language).
+- role_summary: one sentence description
+- stipend: extracted stipend or 'not mentioned'
+
+{jd_list}
+""")
+
+RED_FLAG_KEYWORDS = [
+    'registration fee', 'training fee', 'pay to apply',
+    'performance based stipend', 'unpaid mandatory',
+    'no stipend', 'portfolio fee'
+]
+_RED_FLAG_MATCHER = AhoCorasick(RED_FLAG_KEYWORDS)
+
+# Batch packing: JDs are grouped into one prompt until the estimated input
+# tokens (about 4 characters each) or the item count would exceed these.
+JD_BATCH_TOKEN_BUDGET = int(os.getenv("JD_BATCH_TOKEN_BUDGET", "6000"))
+JD_BATCH_MAX_ITEMS = int(os.getenv("JD_BATCH_MAX_ITEMS", "10"))
+
+# LLM extractions keyed by a hash of the normalized JD text, model and prompt
+# version; a hit skips ChatGroq entirely.
+JD_CACHE = TTLCache(
+    "jd_analysis",
+    max_entries=int(os.getenv("JD_CACHE_SIZE", "2000")),
+    ttl=float(os.getenv("JD_CACHE_TTL", "604800"))
+)
+
+# Concurrent analyses of the same JD (same cache key) share one LLM call,
+# across worker processes too when the cache backend is shared.
+JD_FLIGHT = SingleFlight("analyse", open_backend())
+
+def jd_cache_key(jd_text: str) -> str:
+    normalized = " ".join(jd_text.lower().split())
+    return hashlib.sha256(f"{MODEL_NAME}\0{PROMPT_VERSION}\0{normalized}".encode("utf-8")).hexdigest()
 
-    prompt = PromptTemplate.from_template(prompt_template)
+def cache_stats() -> dict:
+    return JD_CACHE.stats()
 
+def coalescing_stats() -> dict:
+    return JD_FLIGHT.stats()
+
+def _strip_code_fence(content: str) -> str:
+    content = content.strip()
+
+    # Clean markdown blocks if present
+    if content.startswith("```json"):
+        content = content[7:]
+    elif content.startswith("```"):
+        content = content[3:]
+    if content.endswith("```"):
+        content = content[:-3]
+
+    return content.strip()
+
+def _parse_llm_json(content: str) -> dict:
+    llm_data = json.loads(_strip_code_fence(content))
+
+    llm_data.setdefault("hard_skills", [])
+    llm_data.setdefault("quick_learn_skills", [])
+    llm_data.setdefault("role_summary", "")
+    llm_data.setdefault("stipend", "not mentioned")
+    return llm_data
+
+def _rate_limited_fallback(raw_text: str) -> dict:
+    print("Groq is rate-limited, falling back to rule-based JD extraction.")
+    return extract_jd_rules(raw_text)
+
+def _extract_with_llm(jd_text: str, raw_text: str) -> Optional[dict]:
+    """
+    Runs the extraction prompt; returns None if the call or JSON parsing fails,
+    or the rule-based extraction of raw_text if Groq is rate-limited.
+    """
     try:
-        llm = ChatGroq(
-            model="llama-3.3-70b-versatile",
-            api_key=os.getenv("GROQ_API_KEY"),
-            temperature=0.3
-        )
-        chain = prompt | llm
-        
-        response = None
-        for attempt in range(3):
-            try:
-                response = chain.invoke({"jd_text": jd_text})
-                break
-            except Exception as e:
-                if '429' in str(e) and attempt < 2:
-                    time.sleep(15)
-                    continue
-                raise e
-                
-        if response is None:
-             raise Exception("LLM generation failed after retries.")
-
-        content = response.content.strip()
-
-        # Clean markdown blocks if present
-        if content.startswith("```json"):
-            content = content[7:]
-        elif content.startswith("```"):
-            content = content[3:]
-        if content.endswith("```"):
-            content = content[:-3]
-
-        content = content.strip()
-        llm_data = json.loads(content)
-
-        llm_data.setdefault("hard_skills", [])
-        llm_data.setdefault("quick_learn_skills", [])
-        llm_data.setdefault("role_summary", "")
-        llm_data.setdefault("stipend", "not mentioned")
+        with stage_timer("jd_analysis_llm"):
+            response = invoke_with_retry(PROMPT | get_llm(), {"jd_text": jd_text})
+        return _parse_llm_json(response.content)
+    except Exception as e:
+        if is_rate_limited(e):
+            return _rate_limited_fallback(raw_text)
+        print(f"LLM or JSON parsing failed: {e}")
+        return None
 
+async def _aextract_with_llm(jd_text: str, raw_text: str) -> Optional[dict]:
+    try:
+        with stage_timer("jd_analysis_llm"):
+            response = await ainvoke_with_retry(PROMPT | get_llm(), {"jd_text": jd_text})
+        return _parse_llm_json(response.content)
     except Exception as e:
+        if is_rate_limited(e):
+            return _rate_limited_fallback(raw_text)
         print(f"LLM or JSON parsing failed: {e}")
+        return None
+
+def _store(cache_key: str, llm_data: Optional[dict]) -> None:
+    # Only LLM extractions are cached; a rule-based fallback should not keep
+    # the LLM answer away once the rate limit clears.
+    if llm_data is not None and llm_data.get("mode") != "fast":
+        JD_CACHE.set(cache_key, llm_data)
+
+def _cached_extract(cache_key: str, jd_text: str, raw_text: str) -> Optional[dict]:
+    llm_data = JD_CACHE.get(cache_key)
+    if llm_data is None:
+        llm_data = _extract_with_llm(jd_text, raw_text)
+        _store(cache_key, llm_data)
+    return llm_data
+
+async def _astore(cache_key: str, llm_data: Optional[dict]) -> None:
+    if llm_data is not None and llm_data.get("mode") != "fast":
+        await JD_CACHE.aset(cache_key, llm_data)
+
+async def _acached_extract(cache_key: str, jd_text: str, raw_text: str) -> Optional[dict]:
+    llm_data = await JD_CACHE.aget(cache_key)
+    if llm_data is None:
+        llm_data = await _aextract_with_llm(jd_text, raw_text)
+        await _astore(cache_key, llm_data)
+    return llm_data
+
+def _check_mode(mode: Optional[str]) -> str:
+    mode = mode or JD_ANALYSIS_MODE
+    if mode not in JD_ANALYSIS_MODES:
+        raise ValueError(f"Unknown JD analysis mode {mode!r}; expected one of {', '.join(JD_ANALYSIS_MODES)}")
+    return mode
+
+def _normalize(jd_text: str) -> Tuple[str, str]:
+    jd_text = jd_text.strip()
+    jd_text = jd_text.replace('\r\n', ' ')
+    jd_text = jd_text.replace('\n', ' ')
+    jd_text = jd_text.replace('\t', ' ')
+    return jd_text, jd_cache_key(jd_text)
+
+def _red_flags(jd_text: str) -> List[str]:
+    found = _RED_FLAG_MATCHER.find(jd_text.lower())
+    return [kw for kw in RED_FLAG_KEYWORDS if kw in found]
+
+def _finish(jd_text: str, llm_data: Optional[dict]) -> dict:
+    if llm_data is None:
         llm_data = {
             "hard_skills": [],
             "quick_learn_skills": [],
@@ -69,18 +175,205 @@ Job Description: {jd_text}
             "stipend": "not mentioned"
         }
 
-    red_flag_keywords = [
-        'registration fee', 'training fee', 'pay to apply',
-        'performance based stipend', 'unpaid mandatory',
-        'no stipend', 'portfolio fee'
-    ]
-
-    jd_lower = jd_text.lower()
-    red_flags = [kw for kw in red_flag_keywords if kw in jd_lower]
+    red_flags = _red_flags(jd_text)
     legitimacy_score = max(0, 100 - len(red_flags) * 15)
 
     result = {**llm_data}
+    result.setdefault("mode", "llm")
     result["red_flags"] = red_flags
     result["legitimacy_score"] = legitimacy_score
 
-    return result
\ No newline at end of file
+    return result
+
+def analyse_jd(jd_text: str, mode: Optional[str] = None) -> dict:
+    """
+    mode is "llm" (default, JD_ANALYSIS_MODE) or "fast", which skips the
+    network and extracts with jd_rules in a few milliseconds.
+    """
+    mode = _check_mode(mode)
+    raw_text = jd_text
+    jd_text, cache_key = _normalize(jd_text)
+    if mode == "fast":
+        return _finish(jd_text, extract_jd_rules(raw_text))
+    llm_data = JD_FLIGHT.do(cache_key, _cached_extract, cache_key, jd_text, raw_text)
+    return _finish(jd_text, llm_data)
+
+async def analyse_jd_async(jd_text: str, mode: Optional[str] = None) -> dict:
+    """Same as analyse_jd, but awaits the LLM instead of blocking the event loop."""
+    mode = _check_mode(mode)
+    raw_text = jd_text
+    jd_text, cache_key = _normalize(jd_text)
+    if mode == "fast":
+        return _finish(jd_text, extract_jd_rules(raw_text))
+    llm_data = await JD_FLIGHT.ado(cache_key, lambda: _acached_extract(cache_key, jd_text, raw_text))
+    return _finish(jd_text, llm_data)
+
+# --- Batch analysis ---
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def _chunk_for_budget(texts: List[str], indices: List[int]) -> List[List[int]]:
+    """Greedily packs JD indices into chunks that fit JD_BATCH_TOKEN_BUDGET and JD_BATCH_MAX_ITEMS."""
+    chunks: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for i in indices:
+        cost = _estimate_tokens(texts[i])
+        if current and (used + cost > JD_BATCH_TOKEN_BUDGET or len(current) >= JD_BATCH_MAX_ITEMS):
+            chunks.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _batch_inputs(texts: List[str], chunk: List[int]) -> dict:
+    jd_list = "\n\n".join(f"Job Description {n}: {texts[i]}" for n, i in enumerate(chunk))
+    return {"jd_list": jd_list}
+
+def _validate_item(item: Any) -> Optional[dict]:
+    """Returns the item with defaults filled in, or None if it doesn't have the expected shape."""
+    if not isinstance(item, dict):
+        return None
+    item = dict(item)
+    item.pop("id", None)
+    item.setdefault("hard_skills", [])
+    item.setdefault("quick_learn_skills", [])
+    item.setdefault("role_summary", "")
+    item.setdefault("stipend", "not mentioned")
+    for key in ("hard_skills", "quick_learn_skills"):
+        if not isinstance(item[key], list) or not all(isinstance(skill, str) for skill in item[key]):
+            return None
+    if not isinstance(item["role_summary"], str) or not isinstance(item["stipend"], str):
+        return None
+    return item
+
+def _apply_batch_response(content: str, chunk: List[int], keys: List[str], llm_data: List[Optional[dict]]) -> List[int]:
+    """
+    Fills llm_data from one batch response and caches each valid item.
+    Returns the indices whose item was missing or malformed.
+    """
+    try:
+        items = json.loads(_strip_code_fence(content))
+    except ValueError as e:
+        print(f"Batch JSON parsing failed, retrying {len(chunk)} JDs individually: {e}")
+        return list(chunk)
+    if not isinstance(items, list):
+        return list(chunk)
+
+    by_id = {}
+    for position, item in enumerate(items):
+        item_id = item.get("id", position) if isinstance(item, dict) else position
+        if isinstance(item_id, int) and 0 <= item_id < len(chunk):
+            by_id.setdefault(item_id, item)
+
+    failed = []
+    for n, i in enumerate(chunk):
+        item = _validate_item(by_id.get(n))
+        if item is None:
+            failed.append(i)
+            continue
+        llm_data[i] = item
+        JD_CACHE.set(keys[i], item)
+    return failed
+
+def _plan_batch(jd_texts: List[str]) -> Tuple[List[str], List[str], List[Optional[dict]], List[List[int]]]:
+    """
+    Normalizes the JDs and looks them up in JD_CACHE. Returns (texts, keys,
+    llm_data, chunks) where chunks group the first occurrence of every miss.
+    """
+    texts, keys = [], []
+    for jd_text in jd_texts:
+        text, key = _normalize(jd_text)
+        texts.append(text)
+        keys.append(key)
+
+    llm_data: List[Optional[dict]] = [None] * len(texts)
+    first_seen = {}
+    pending = []
+    for i, key in enumerate(keys):
+        if key in first_seen:
+            continue
+        first_seen[key] = i
+        llm_data[i] = JD_CACHE.get(key)
+        if llm_data[i] is None:
+            pending.append(i)
+    return texts, keys, llm_data, _chunk_for_budget(texts, pending)
+
+def _finish_batch(texts: List[str], keys: List[str], llm_data: List[Optional[dict]]) -> List[dict]:
+    # Duplicates of a JD share the result of its first occurrence.
+    by_key = {}
+    for key, data in zip(keys, llm_data):
+        if data is not None:
+            by_key.setdefault(key, data)
+
+    # Red flags share one precompiled automaton, one pass per JD.
+    return [_finish(text, by_key.get(key)) for text, key in zip(texts, keys)]
+
+def _batch_failed(e: Exception, chunk: List[int], jd_texts: List[str], llm_data: List[Optional[dict]]) -> List[int]:
+    """Handles a failed batch call; returns the indices still to retry one at a time."""
+    if is_rate_limited(e):
+        # Retrying each JD would only hit the same limit; use the rules instead.
+        print(f"Groq is rate-limited, falling back to rule-based extraction for {len(chunk)} JDs.")
+        for i in chunk:
+            llm_data[i] = extract_jd_rules(jd_texts[i])
+        return []
+    print(f"Batch LLM call failed, retrying {len(chunk)} JDs individually: {e}")
+    return list(chunk)
+
+def _fast_batch(jd_texts: List[str]) -> List[dict]:
+    return [_finish(_normalize(jd_text)[0], extract_jd_rules(jd_text)) for jd_text in jd_texts]
+
+def analyse_jd_batch(jd_texts: List[str], mode: Optional[str] = None) -> List[dict]:
+    """
+    Analyses many JDs with as few LLM calls as possible: cache misses are
+    packed into prompts of up to JD_BATCH_TOKEN_BUDGET estimated tokens that
+    return a JSON array. Items missing or malformed in a batch response are
+    retried one at a time through the single-JD prompt.
+    Results are returned in input order, shaped like analyse_jd's.
+    """
+    if _check_mode(mode) == "fast":
+        return _fast_batch(jd_texts)
+    texts, keys, llm_data, chunks = _plan_batch(jd_texts)
+
+    failed = []
+    for chunk in chunks:
+        try:
+            with stage_timer("jd_analysis_batch_llm"):
+                response = invoke_with_retry(BATCH_PROMPT | get_llm(), _batch_inputs(texts, chunk))
+            failed.extend(_apply_batch_response(response.content, chunk, keys, llm_data))
+        except Exception as e:
+            failed.extend(_batch_failed(e, chunk, jd_texts, llm_data))
+
+    for i in failed:
+        llm_data[i] = _extract_with_llm(texts[i], jd_texts[i])
+        _store(keys[i], llm_data[i])
+
+    return _finish_batch(texts, keys, llm_data)
+
+async def analyse_jd_batch_async(jd_texts: List[str], mode: Optional[str] = None) -> List[dict]:
+    """
+    Same as analyse_jd_batch, with the batch calls (and then the per-JD
+    retries) awaited concurrently. Cache lookups and writes run on threads.
+    """
+    if _check_mode(mode) == "fast":
+        return _fast_batch(jd_texts)
+    texts, keys, llm_data, chunks = await asyncio.to_thread(_plan_batch, jd_texts)
+
+    async def run_chunk(chunk: List[int]) -> List[int]:
+        try:
+            with stage_timer("jd_analysis_batch_llm"):
+                response = await ainvoke_with_retry(BATCH_PROMPT | get_llm(), _batch_inputs(texts, chunk))
+            return await asyncio.to_thread(_apply_batch_response, response.content, chunk, keys, llm_data)
+        except Exception as e:
+            return _batch_failed(e, chunk, jd_texts, llm_data)
+
+    failed = [i for chunk_failed in await asyncio.gather(*[run_chunk(chunk) for chunk in chunks]) for i in chunk_failed]
+    retried = await asyncio.gather(*[_aextract_with_llm(texts[i], jd_texts[i]) for i in failed])
+    for i, data in zip(failed, retried):
+        llm_data[i] = data
+        await _astore(keys[i], data)
+
+    return _finish_batch(texts, keys, llm_data)
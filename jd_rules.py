@@ -0,0 +1,162 @@
+import re
+from typing import Dict, List, Tuple
+from keyword_matcher import AhoCorasick
+from github_ingestor import PACKAGE_SKILL_MAP
+from fit_scorer import ALIASES
+from resume_parser import SKILL_KEYWORDS
+
+# Package names that are also everyday English words; matching them in prose
+# ("handles requests", "a fast-paced express delivery team") gives junk skills.
+AMBIGUOUS_TERMS = {
+    'requests', 'datasets', 'evaluate', 'motor', 'bottle', 'falcon', 'express',
+    'dash', 'coverage', 'fabric', 'faker', 'guidance', 'instructor', 'outlines',
+    'rocket', 'gin', 'fiber', 'parcel', 'lime', 'paddle', 'haystack', 'lightning',
+    'hypothesis', 'flair', 'stanza', 'jest', 'cryptography', 'tch', 'tox',
+    'cohere', 'anthropic', 'groq', 'prefect', 'desktop', 'mobile', 'security',
+    'testing', 'unittest', 'ml'
+}
+
+# Languages and spellings that show up in JDs but not in package manifests.
+EXTRA_TERMS = {
+    'typescript': 'typescript', 'golang': 'go', 'rust': 'rust', 'kotlin': 'kotlin',
+    'swift': 'swift', 'html': 'html', 'css': 'css', 'c#': 'c#', 'ruby': 'ruby',
+    'php': 'php', 'scala': 'scala', 'gcp': 'gcp', 'k8s': 'kubernetes',
+    'postgres': 'postgresql', 'node.js': 'node', 'nodejs': 'node',
+    'react.js': 'react', 'reactjs': 'react', 'next.js': 'nextjs', 'vue.js': 'vue',
+    'opencv': 'opencv', 'sklearn': 'scikit-learn', 'hugging face': 'transformers',
+    'ci/cd': 'devops', 'rest api': 'rest apis', 'rest apis': 'rest apis'
+}
+
+def _build_lexicon() -> Dict[str, str]:
+    """Maps every surface form (lowercase) to the skill name reported for it."""
+    lexicon: Dict[str, str] = {}
+    for package, category in PACKAGE_SKILL_MAP.items():
+        lexicon[package] = package
+        lexicon[category] = category
+    for skill, terms in ALIASES.items():
+        lexicon[skill] = skill
+        for term in terms:
+            lexicon[term.lower()] = term.lower()
+    for keyword in SKILL_KEYWORDS:
+        lexicon[keyword] = keyword
+    lexicon.update(EXTRA_TERMS)
+    for term in list(lexicon):
+        if '-' in term:
+            # "scikit-learn" is often written "scikit learn"
+            lexicon.setdefault(term.replace('-', ' '), lexicon[term])
+    for term in AMBIGUOUS_TERMS:
+        lexicon.pop(term, None)
+    return lexicon
+
+SKILL_LEXICON = _build_lexicon()
+_SKILL_AUTOMATON = AhoCorasick(SKILL_LEXICON, word_boundary=True)
+
+# Libraries and tools: a candidate can learn the basics of one in under two
+# weeks, unlike a language, a field, or a whole category of skills.
+QUICK_LEARN_SKILLS = set(PACKAGE_SKILL_MAP) - set(PACKAGE_SKILL_MAP.values())
+
+# Section headings: at a line start or after a sentence break and followed
+# by a colon or line break, or anywhere when followed by a colon (JDs pasted
+# as one line). The text up to the next heading belongs to that section.
+_MANDATORY = r"must[- ]haves?|mandatory(?: skills| requirements)?|required(?: skills| qualifications)?|requirements|minimum qualifications|basic qualifications|what you(?:'ll)? need|who you are"
+_PREFERRED = r"preferred(?: skills| qualifications)?|nice[- ]to[- ]haves?|good[- ]to[- ]haves?|bonus(?: points)?|pluses|desired skills"
+_OTHER = r"responsibilities|what you(?:'ll)? do|about(?: us| the role| the company)?|perks|benefits|stipend|compensation|duration|location|how to apply"
+_HEADING = rf"(?:(?P<mandatory>{_MANDATORY})|(?P<preferred>{_PREFERRED})|(?P<other>{_OTHER}))"
+HEADING_RE = re.compile(
+    rf"(?:^|(?<=[\n.;•]))[ \t#*•\-]*{_HEADING}[ \t*]*(?::|\n|$)|\b{_HEADING.replace('?P<', '?P<inline_')}[ \t*]*:",
+    re.IGNORECASE | re.MULTILINE
+)
+
+_AMOUNT = r"\d[\d,]*(?:\.\d+)?\s*[kK]?"
+_CURRENCY = r"(?:₹|rs\.?|inr|\$|usd|€|eur|£|gbp)"
+_PERIOD = r"(?:\s*(?:/|per|a)\s*(?:month|mo|week|wk|hour|hr|annum|year|yr))?"
+STIPEND_RE = re.compile(
+    rf"{_CURRENCY}\s*{_AMOUNT}(?:\s*(?:-|–|to)\s*{_CURRENCY}?\s*{_AMOUNT})?{_PERIOD}"
+    rf"|{_AMOUNT}(?:\s*(?:-|–|to)\s*{_AMOUNT})?\s*{_CURRENCY}{_PERIOD}",
+    re.IGNORECASE
+)
+_STIPEND_CONTEXT_RE = re.compile(r"stipend|salary|compensation|pay\b|ctc", re.IGNORECASE)
+_UNPAID_RE = re.compile(r"\bunpaid\b|\bno stipend\b", re.IGNORECASE)
+_TITLE_RE = re.compile(r"(?:job title|position|role|title)\s*[:\-]\s*(?P<title>[^\n.;]{3,80})", re.IGNORECASE)
+
+def _sections(jd_text: str) -> List[Tuple[str, str]]:
+    """Splits the JD into (kind, text) pieces; kind is mandatory, preferred or other."""
+    pieces = []
+    kind, start = "other", 0
+    for heading in HEADING_RE.finditer(jd_text):
+        pieces.append((kind, jd_text[start:heading.start()]))
+        kind, start = heading.lastgroup.replace("inline_", ""), heading.end()
+    pieces.append((kind, jd_text[start:]))
+    return pieces
+
+def _skills_in(text: str) -> List[str]:
+    found = {}
+    for position, term in _SKILL_AUTOMATON.iter_matches(text.lower()):
+        found.setdefault(SKILL_LEXICON[term], position)
+    return sorted(found, key=found.get)
+
+def _stipend(jd_text: str) -> str:
+    matches = list(STIPEND_RE.finditer(jd_text))
+    if matches:
+        # Prefer an amount shortly after a stipend/salary mention over, say, a funding figure.
+        for context in _STIPEND_CONTEXT_RE.finditer(jd_text):
+            for match in matches:
+                if 0 <= match.start() - context.end() <= 80:
+                    return match.group(0).strip()
+        return matches[0].group(0).strip()
+    if _UNPAID_RE.search(jd_text):
+        return "unpaid"
+    return "not mentioned"
+
+def _role_summary(jd_text: str) -> str:
+    title = _TITLE_RE.search(jd_text)
+    if title:
+        return title.group("title").strip()
+    # Summarise from the intro, before the first section heading; a JD that
+    # opens with a heading is summarised from its first line that isn't one.
+    first_heading = HEADING_RE.search(jd_text)
+    intro = jd_text[:first_heading.start()] if first_heading else jd_text
+    lines = [line.strip(" \t#*•-") for line in intro.splitlines() if line.strip(" \t#*•-")]
+    if not lines:
+        lines = [
+            line.strip(" \t#*•-") for line in jd_text.splitlines()
+            if line.strip(" \t#*•-") and not HEADING_RE.match(line)
+        ]
+    if not lines:
+        return ""
+    if len(lines[0]) <= 80:
+        return lines[0]
+    sentence = re.split(r"(?<=[.!?])\s", lines[0], maxsplit=1)[0]
+    return sentence if len(sentence) <= 160 else sentence[:157].rstrip() + "..."
+
+def extract_jd_rules(jd_text: str) -> dict:
+    """
+    Offline, LLM-free counterpart of the JD extraction prompt: returns the same
+    keys (hard_skills, quick_learn_skills, role_summary, stipend) in a few
+    milliseconds. Skills come from a lexicon built out of PACKAGE_SKILL_MAP,
+    fit_scorer.ALIASES and the resume keywords. When the JD has Mandatory-style
+    headings only those sections count as hard skills, and skills only listed
+    under Preferred-style headings are left out. As in the prompt, quick-learn
+    skills are a subset of the requirements: the libraries among the hard
+    skills. Pass the raw JD text so line-based headings survive.
+    """
+    mandatory: List[str] = []
+    preferred: List[str] = []
+    other: List[str] = []
+    by_kind = {"mandatory": mandatory, "preferred": preferred, "other": other}
+    has_mandatory = False
+    for kind, text in _sections(jd_text):
+        has_mandatory = has_mandatory or kind == "mandatory"
+        by_kind[kind].extend(_skills_in(text))
+
+    hard = mandatory if has_mandatory else other
+    hard_skills = list(dict.fromkeys(hard))
+    quick_learn = [skill for skill in hard_skills if skill in QUICK_LEARN_SKILLS]
+
+    return {
+        "hard_skills": hard_skills,
+        "quick_learn_skills": quick_learn,
+        "role_summary": _role_summary(jd_text),
+        "stipend": _stipend(jd_text),
+        "mode": "fast"
+    }
@@ -0,0 +1,251 @@
+import os
+import json
+import socket
+import time
+import uuid
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+from github_ingestor import get_competency_map
+from cover_letter_generator import generate_from_inputs
+from llm_scheduler import BATCH, priority
+
+# Job state lives in SQLite so queued and half-done jobs survive a restart;
+# on startup anything not finished is queued again. Worker processes sharing
+# the file claim each job atomically, so a job runs in exactly one of them.
+JOBS_DB_PATH = os.getenv("FITR_JOBS_DB", "fitr_jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Finished jobs are deleted this many seconds after they complete.
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "86400"))
+# A running job counts as abandoned after this long without progress.
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "600"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _worker_alive(owner: Optional[str], updated_at: float) -> bool:
+    """
+    Whether the worker that claimed a job may still be running it: a worker
+    on this host whose pid is gone is not; otherwise the job must have made
+    progress within JOB_STALE_AFTER seconds (pids get reused).
+    """
+    if owner == _worker_id():
+        # Our own pid on a job this process isn't running: the pid was reused
+        # from a previous process (e.g. pid 1 in a restarted container).
+        return False
+    host, _, pid = (owner or "").rpartition(":")
+    if host == socket.gethostname() and pid.isdigit():
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+    return time.time() - updated_at < JOB_STALE_AFTER
+
+# Jobs claimed by this process that are still running.
+_running_here: Set[str] = set()
+_running_lock = threading.Lock()
+
+class JobStore:
+    """SQLite table of jobs: status, progress (done / total), the latest partial result and the final result."""
+
+    def __init__(self, db_path: str = JOBS_DB_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path or ":memory:", check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT, params TEXT, status TEXT, "
+            "done INTEGER, total INTEGER, partial TEXT, result TEXT, error TEXT, "
+            "created_at REAL, updated_at REAL, owner TEXT)"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self._db.commit()
+
+    def create(self, kind: str, params: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, kind, params, status, done, total, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 0, 0, ?, ?)",
+                (job_id, kind, json.dumps(params), QUEUED, now, now)
+            )
+            self._db.commit()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, kind, params, status, done, total, partial, result, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "params": json.loads(row[2]),
+            "status": row[3],
+            "progress": {"done": row[4], "total": row[5]},
+            "partial": json.loads(row[6]) if row[6] else None,
+            "result": json.loads(row[7]) if row[7] else None,
+            "error": row[8],
+            "created_at": row[9],
+            "updated_at": row[10]
+        }
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._db.commit()
+
+    def claim(self, job_id: str) -> bool:
+        """Marks a queued job as running in this worker; False if another worker got it first."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, owner = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, _worker_id(), time.time(), job_id, QUEUED)
+            )
+            self._db.commit()
+        return cursor.rowcount == 1
+
+    def requeue_orphans(self) -> int:
+        """Puts jobs whose worker process has died back in the queue."""
+        with self._lock:
+            rows = self._db.execute("SELECT id, owner, updated_at FROM jobs WHERE status = ?", (RUNNING,)).fetchall()
+        requeued = 0
+        for job_id, owner, updated_at in rows:
+            if job_id in _running_here or _worker_alive(owner, updated_at):
+                continue
+            with self._lock:
+                cursor = self._db.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ? AND owner IS ?",
+                    (QUEUED, time.time(), job_id, RUNNING, owner)
+                )
+                self._db.commit()
+            requeued += cursor.rowcount
+        return requeued
+
+    def progress(self, job_id: str, done: int, total: int, partial: Any) -> None:
+        self._update(job_id, done=done, total=total, partial=json.dumps(partial))
+
+    def finish(self, job_id: str, result: Any) -> None:
+        self._update(job_id, status=DONE, result=json.dumps(result), partial=None)
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._update(job_id, status=FAILED, error=error)
+
+    def queued(self) -> List[Dict[str, Any]]:
+        """Jobs waiting for a worker, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        return [self.get(row[0]) for row in rows]
+
+    def prune(self, older_than: float) -> None:
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (DONE, FAILED, time.time() - older_than)
+            )
+            self._db.commit()
+
+def _run_ingest(store: JobStore, job_id: str, params: Dict[str, Any]) -> None:
+    try:
+        result = get_competency_map(
+            params["github_url"],
+            backend=params.get("backend"),
+            progress=lambda done, total, partial: store.progress(job_id, done, total, partial)
+        )
+    except Exception as e:
+        print(f"Ingest job {job_id} failed: {e}")
+        store.fail(job_id, str(e))
+        return
+    if isinstance(result, dict) and "error" in result:
+        store.fail(job_id, result["error"])
+    else:
+        store.finish(job_id, result)
+
+def _run_cover_letter(store: JobStore, job_id: str, params: Dict[str, Any]) -> None:
+    # The LLM letter behind a draft-mode response; it also lands in the
+    # cover letter cache, so the same inputs get it directly next time.
+    letter = generate_from_inputs(params["inputs"])
+    if letter is None:
+        store.fail(job_id, "Cover letter generation failed")
+    else:
+        store.finish(job_id, {"cover_letter": letter})
+
+JOB_HANDLERS: Dict[str, Callable[[JobStore, str, Dict[str, Any]], None]] = {
+    "ingest": _run_ingest,
+    "cover_letter": _run_cover_letter
+}
+
+class JobQueue:
+    """Runs jobs from a JobStore on a small thread pool."""
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS):
+        self.store = store
+        self.workers = workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _submit(self, job_id: str, kind: str, params: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            self._pool.submit(self._run, job_id, kind, params)
+
+    def _run(self, job_id: str, kind: str, params: Dict[str, Any]) -> None:
+        with _running_lock:
+            if job_id in _running_here:
+                return
+            _running_here.add(job_id)
+        try:
+            if self.store.claim(job_id):
+                try:
+                    # Nobody is waiting on a job's LLM calls (a draft-mode caller
+                    # already has its draft), so they queue behind interactive ones.
+                    with priority(BATCH):
+                        JOB_HANDLERS[kind](self.store, job_id, params)
+                except Exception as e:
+                    # A handler that raises would otherwise leave the job RUNNING
+                    # until a restart, with the error lost in the pool's future.
+                    print(f"{kind} job {job_id} failed: {e}")
+                    self.store.fail(job_id, str(e))
+        finally:
+            _running_here.discard(job_id)
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> str:
+        job_id = self.store.create(kind, params)
+        self._submit(job_id, kind, params)
+        return job_id
+
+    def resume(self) -> int:
+        """
+        Picks up queued jobs, including those whose worker died mid-run;
+        returns how many. Every worker does this at startup and the claim
+        decides which one runs each job.
+        """
+        self.store.prune(JOB_RETENTION)
+        self.store.requeue_orphans()
+        jobs = self.store.queued()
+        for job in jobs:
+            self._submit(job["id"], job["kind"], job["params"])
+        return len(jobs)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+JOBS = JobQueue(JobStore())
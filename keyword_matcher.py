@@ -0,0 +1,71 @@
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+class AhoCorasick:
+    """
+    Multi-keyword matcher: finds every pattern occurring in a text in a single
+    pass, however many patterns there are. With word_boundary=True a match
+    only counts when it isn't glued to letters or digits on either side, so
+    "java" does not match inside "javascript" nor "git" inside "github".
+    Patterns are matched as given; lowercase both sides for case-insensitivity.
+    """
+
+    def __init__(self, patterns: Iterable[str], word_boundary: bool = False):
+        self.word_boundary = word_boundary
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for pattern in dict.fromkeys(patterns):
+            if pattern:
+                self._add(pattern)
+        self._link()
+
+    def _add(self, pattern: str) -> None:
+        node = 0
+        for char in pattern:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                # Inherit the suffix node's matches so lookups never walk fail links.
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yields (start, pattern) for every occurrence, overlapping ones included."""
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        node = 0
+        for end, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for index in out[node]:
+                pattern = patterns[index]
+                start = end - len(pattern) + 1
+                if self.word_boundary and (
+                    (start > 0 and text[start - 1].isalnum())
+                    or (end + 1 < len(text) and text[end + 1].isalnum())
+                ):
+                    continue
+                yield start, pattern
+
+    def find(self, text: str) -> Set[str]:
+        """Returns the set of patterns that occur in text."""
+        return {pattern for _, pattern in self.iter_matches(text)}
@@ -0,0 +1,66 @@
+import os
+import random
+from typing import Dict, Any
+from clients import CLIENTS
+from llm_scheduler import SCHEDULER, estimate_tokens, retry_after
+from metrics import LLM_RATE_LIMITED, record_llm_usage
+
+# Retry policy for rate-limited (429) calls: wait out Groq's Retry-After, or
+# back off exponentially with full jitter when it doesn't send one. Every
+# attempt goes through the shared LLMScheduler.
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "2"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+
+def get_llm(temperature: float = 0.3) -> Any:
+    """Returns the application-wide ChatGroq client for a temperature from the client registry."""
+    return CLIENTS.llm(temperature)
+
+def is_rate_limited(e: Exception) -> bool:
+    status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    return status == 429
+
+def backoff_delay(attempt: int) -> float:
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+def on_rate_limited(e: Exception, attempt: int) -> None:
+    """Pauses the scheduler queue for Groq's Retry-After, or a backoff delay if it gave none."""
+    LLM_RATE_LIMITED.inc()
+    SCHEDULER.pause(retry_after(e) or backoff_delay(attempt))
+
+def invoke_with_retry(chain: Any, inputs: Dict[str, Any]) -> Any:
+    tokens = estimate_tokens(inputs)
+    ticket = SCHEDULER.ticket()
+    for attempt in range(LLM_MAX_ATTEMPTS):
+        SCHEDULER.acquire(tokens, ticket)
+        try:
+            response = chain.invoke(inputs)
+            SCHEDULER.settle(tokens, response)
+            record_llm_usage(response)
+            return response
+        except Exception as e:
+            if is_rate_limited(e):
+                on_rate_limited(e, attempt)
+                if attempt < LLM_MAX_ATTEMPTS - 1:
+                    continue
+            raise e
+    raise Exception("LLM generation failed after retries.")
+
+async def ainvoke_with_retry(chain: Any, inputs: Dict[str, Any]) -> Any:
+    """Async counterpart of invoke_with_retry; queues on the event loop so it keeps serving."""
+    tokens = estimate_tokens(inputs)
+    ticket = SCHEDULER.ticket()
+    for attempt in range(LLM_MAX_ATTEMPTS):
+        await SCHEDULER.aacquire(tokens, ticket)
+        try:
+            response = await chain.ainvoke(inputs)
+            SCHEDULER.settle(tokens, response)
+            record_llm_usage(response)
+            return response
+        except Exception as e:
+            if is_rate_limited(e):
+                on_rate_limited(e, attempt)
+                if attempt < LLM_MAX_ATTEMPTS - 1:
+                    continue
+            raise e
+    raise Exception("LLM generation failed after retries.")
@@ -0,0 +1,188 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Groq budgets for the configured model; calls queue instead of hitting 429s.
+LLM_RPM = float(os.getenv("LLM_RPM", "30"))
+LLM_TPM = float(os.getenv("LLM_TPM", "6000"))
+# Tokens assumed per call on top of the prompt inputs: the template plus the reply.
+LLM_CALL_OVERHEAD_TOKENS = int(os.getenv("LLM_CALL_OVERHEAD_TOKENS", "600"))
+# How often a queued call that isn't at the head of the queue re-checks.
+LLM_QUEUE_POLL = 0.05
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Priority of LLM calls made from the current request/task; batch routes set
+# BATCH so interactive /full-analysis calls are scheduled ahead of them.
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+@contextmanager
+def priority(level: int) -> Iterator[None]:
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority() -> int:
+    return _priority.get()
+
+class TokenBucket:
+    """Holds up to `per_minute` units and refills continuously at per_minute / 60 per second."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (after refill)."""
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate) if self.rate > 0 else 0.0
+
+def estimate_tokens(inputs: Dict[str, Any]) -> int:
+    return sum(len(str(value)) for value in inputs.values()) // 4 + LLM_CALL_OVERHEAD_TOKENS
+
+def retry_after(e: Exception) -> Optional[float]:
+    """Seconds from a Retry-After header on a rate-limit error, if the error carries one."""
+    headers = getattr(getattr(e, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+class LLMScheduler:
+    """
+    Process-wide gate in front of Groq. Every call takes one request from the
+    RPM bucket and its estimated tokens from the TPM bucket; calls that don't
+    fit wait in a queue ordered by priority, then arrival, so an interactive
+    request overtakes queued batch work and equal priorities are served
+    first come, first served. A Retry-After from Groq pauses the whole queue.
+    Usable from threads (acquire) and coroutines (aacquire).
+    """
+
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._lock = threading.Lock()
+        self._queue: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self.granted = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def ticket(self, level: Optional[int] = None) -> Tuple[int, int]:
+        """A queue position; reuse it when retrying so the call keeps its place."""
+        return (current_priority() if level is None else level, next(self._seq))
+
+    def _try_acquire(self, ticket: Tuple[int, int], tokens: int) -> float:
+        """Grants the call and returns 0, or returns how long to wait before trying again."""
+        now = time.monotonic()
+        with self._lock:
+            if ticket not in self._queue:
+                heapq.heappush(self._queue, ticket)
+            if self._queue[0] != ticket:
+                return LLM_QUEUE_POLL
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            wait = max(self._paused_until - now, self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait > 0:
+                return wait
+            heapq.heappop(self._queue)
+            self.requests.tokens -= 1
+            self.tokens.tokens -= min(tokens, self.tokens.capacity)
+            return 0.0
+
+    def _granted(self, waited: float) -> None:
+        with self._lock:
+            self.granted += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def acquire(self, tokens: int, ticket: Optional[Tuple[int, int]] = None) -> None:
+        ticket = ticket or self.ticket()
+        start = time.monotonic()
+        try:
+            while True:
+                wait = self._try_acquire(ticket, tokens)
+                if wait == 0:
+                    break
+                time.sleep(wait)
+        except BaseException:
+            self._leave(ticket)
+            raise
+        self._granted(time.monotonic() - start)
+
+    async def aacquire(self, tokens: int, ticket: Optional[Tuple[int, int]] = None) -> None:
+        ticket = ticket or self.ticket()
+        start = time.monotonic()
+        try:
+            while True:
+                wait = self._try_acquire(ticket, tokens)
+                if wait == 0:
+                    break
+                await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            self._leave(ticket)
+            raise
+        self._granted(time.monotonic() - start)
+
+    def _leave(self, ticket: Tuple[int, int]) -> None:
+        with self._lock:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+
+    def settle(self, estimated: int, response: Any) -> None:
+        """Corrects the TPM bucket once the real token usage of a call is known."""
+        usage = getattr(response, "usage_metadata", None) or {}
+        actual = usage.get("total_tokens")
+        if actual is None:
+            return
+        with self._lock:
+            self.tokens.tokens -= actual - min(estimated, self.tokens.capacity)
+
+    def pause(self, seconds: float) -> None:
+        """Holds every queued call for `seconds`, e.g. after a 429 with Retry-After."""
+        with self._lock:
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for level, _ in self._queue:
+                depth[PRIORITY_NAMES.get(level, str(level))] += 1
+            return {
+                "queue_depth": depth,
+                "granted": self.granted,
+                "rate_limited": self.rate_limited,
+                "avg_wait_ms": round(self.total_wait / self.granted * 1000, 1) if self.granted else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+                "paused_for_s": round(max(0.0, self._paused_until - time.monotonic()), 1),
+                "rpm_available": round(self.requests.tokens, 1),
+                "tpm_available": round(self.tokens.tokens)
+            }
+
+# Each worker process (uvicorn --workers, default $WEB_CONCURRENCY) schedules
+# against an equal share of the Groq budget.
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+SCHEDULER = LLMScheduler(LLM_RPM / WEB_CONCURRENCY, LLM_TPM / WEB_CONCURRENCY)
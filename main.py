@@ -1,20 +1,48 @@
 import os
-from fastapi import FastAPI, Form, UploadFile, File
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Form, UploadFile, File, Query, Request
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from github_ingestor import get_competency_map
-from jd_analyser import analyse_jd
-from fit_scorer import calculate_fit
-from cover_letter_generator import generate_cover_letter
+from github_ingestor import get_competency_map, rate_limit_status, cache_stats as github_cache_stats, coalescing_stats as ingest_coalescing_stats
+from jd_analyser import analyse_jd_async, analyse_jd_batch_async, cache_stats as jd_cache_stats, coalescing_stats as jd_coalescing_stats
+from fit_scorer import calculate_fit, calculate_fit_batch
+from clients import CLIENTS
+from jobs import JOBS
+from cover_letter_generator import check_mode as check_cover_letter_mode, draft_cover_letter, generate_cover_letter_async, stream_cover_letter, cache_stats as cover_letter_cache_stats, coalescing_stats as cover_letter_coalescing_stats
 from copy import deepcopy
-from resume_parser import extract_resume_skills
+from llm_scheduler import BATCH, SCHEDULER, priority
+from metrics import SERVER_TIMING, observe_stage, stage_timer, start_request_timings, end_request_timings, server_timing_header, render as render_metrics
+from resume_parser import RESUME_MAX_BYTES, extract_resume_skills_async, shutdown_process_pool, cache_stats as resume_cache_stats
 from typing import Dict, List, Any, Optional
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = FastAPI(title="Fitr API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Opens the shared GitHub / Groq clients once for the application's lifetime
+    and requeues background jobs a previous process left unfinished. On
+    shutdown the resume parse workers are stopped too.
+    """
+    CLIENTS.open()
+    resumed = JOBS.resume()
+    if resumed:
+        print(f"Requeued {resumed} unfinished job(s)")
+    try:
+        yield
+    finally:
+        JOBS.shutdown()
+        shutdown_process_pool()
+        await CLIENTS.aclose()
+
+app = FastAPI(title="Fitr API", lifespan=lifespan)
 
 # Configure CORS Middleware
 app.add_middleware(
@@ -25,19 +53,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def server_timing_middleware(request: Request, call_next):
+    """With SERVER_TIMING set, reports each stage's duration in a Server-Timing header."""
+    if not SERVER_TIMING:
+        return await call_next(request)
+    timings, token = start_request_timings()
+    try:
+        response = await call_next(request)
+    finally:
+        end_request_timings(token)
+    if timings:
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
 # --- Pydantic Models for Request Bodies ---
 
 class IngestRequest(BaseModel):
     github_url: str
+    backend: Optional[str] = None  # "rest" or "graphql"; defaults to GITHUB_BACKEND
 
 class AnalyseRequest(BaseModel):
     jd_text: str
+    mode: Optional[str] = None  # "llm" or "fast"; defaults to JD_ANALYSIS_MODE
+
+class AnalyseBatchRequest(BaseModel):
+    jd_texts: List[str]
+    mode: Optional[str] = None
 
 class FitRequest(BaseModel):
     competency_map: Dict[str, Any]
     jd_analysis: Dict[str, Any]
     github_url: str
     role_summary: str
+    cover_letter_mode: Optional[str] = None  # "llm" or "draft"; defaults to COVER_LETTER_MODE
+
+class FitBatchRequest(BaseModel):
+    competency_maps: List[Dict[str, Any]]
+    jd_analyses: List[Dict[str, Any]]
+    top_k: Optional[int] = None
+    include_cover_letter: bool = False
+    github_urls: Optional[List[str]] = None  # one per competency map, used for cover letters
 
 class FullAnalysisRequest(BaseModel):
     github_url: str
@@ -47,101 +103,326 @@ class FullAnalysisRequest(BaseModel):
 
 # mock_fit replaced by calculate_fit from fit_calculator
 
+# --- Pipeline Helpers ---
+
+async def timed(timings: Dict[str, float], stage: str, awaitable: Any) -> Any:
+    """Awaits a pipeline stage and records its wall time in ms under timings[stage]."""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 1)
+
+def cancel_all(*tasks: Optional[asyncio.Task]) -> None:
+    for task in tasks:
+        if task is not None and not task.done():
+            task.cancel()
+
+def start_stages(github_url: str, jd_text: str, pdf_bytes: Optional[bytes], backend: Optional[str], mode: Optional[str], timings: Dict[str, float]):
+    """
+    Starts the independent pipeline stages: GitHub ingest and PDF parsing on
+    the thread pool, the JD analysis LLM call on the event loop.
+    Returns (github_task, resume_task or None, jd_task).
+    """
+    github_task = asyncio.create_task(timed(
+        timings, "github_ingest_ms", run_in_threadpool(get_competency_map, github_url, backend=backend)
+    ))
+    resume_task = None
+    if pdf_bytes:
+        resume_task = asyncio.create_task(timed(
+            timings, "resume_parse_ms", extract_resume_skills_async(pdf_bytes)
+        ))
+    jd_task = asyncio.create_task(timed(timings, "jd_analysis_ms", analyse_jd_async(jd_text, mode=mode)))
+    return github_task, resume_task, jd_task
+
+def merge_resume_skills(competency_map: Dict[str, Any], resume_skills: Any) -> None:
+    for skill in resume_skills:
+        if skill not in competency_map:
+            competency_map[skill] = 0.85
+        else:
+            competency_map[skill] = min(1.0, competency_map[skill] + 0.1)
+
+async def cover_letter_fields(fit_result: Dict[str, Any], competency_map: Dict[str, Any], role_summary: str, github_url: str, mode: str) -> Dict[str, Any]:
+    """
+    The cover letter keys of a fit result. In draft mode a templated letter is
+    returned at once and the LLM letter is queued as a background job, unless
+    it is already cached.
+    """
+    if mode == "llm":
+        letter = await generate_cover_letter_async(
+            fit_result=fit_result,
+            competency_map=competency_map,
+            role_summary=role_summary,
+            github_url=github_url
+        )
+        return {"cover_letter": letter}
+    letter, final, inputs = await run_in_threadpool(draft_cover_letter, fit_result, competency_map, role_summary, github_url)
+    if final:
+        return {"cover_letter": letter, "cover_letter_status": "final"}
+    job_id = await run_in_threadpool(JOBS.submit, "cover_letter", {"inputs": inputs})
+    return {"cover_letter": letter, "cover_letter_status": "draft", "cover_letter_job_id": job_id}
+
+def sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 # --- Routes ---
 
 @app.post("/ingest")
-async def ingest_route(request: IngestRequest):
+async def ingest_route(request: IngestRequest, run_async: bool = Query(False, alias="async")):
     """
-    Accepts {github_url: str}, returns {competency_map: dict}
+    Accepts {github_url: str}, returns {competency_map: dict}.
+    With ?async=true the ingest runs as a background job and the response is
+    {job_id, status}; poll GET /jobs/{job_id} for progress and the result.
     """
+    if run_async:
+        job_id = JOBS.submit("ingest", {"github_url": request.github_url, "backend": request.backend})
+        return {"job_id": job_id, "status": "queued"}
     try:
-        return {"competency_map": get_competency_map(request.github_url)}
+        competency_map = await run_in_threadpool(get_competency_map, request.github_url, backend=request.backend)
+        return {"competency_map": competency_map}
     except Exception as e:
         return {"error": str(e)}
 
+@app.get("/jobs/{job_id}")
+async def job_route(job_id: str):
+    """
+    Returns a background job: status (queued/running/done/failed), progress
+    {done, total} in repos, the partial competency map built so far while it
+    runs, and the result or error once it finishes. A draft-mode cover letter's
+    job has {cover_letter} as its result.
+    """
+    job = await run_in_threadpool(JOBS.store.get, job_id)
+    if job is None:
+        return {"error": f"Job {job_id} not found"}
+    return job
+
 @app.post("/analyse")
 async def analyse_route(request: AnalyseRequest):
     """
     Accepts {jd_text: str}, returns {hard_skills, nice_to_have, red_flags, legitimacy_score}
     """
     try:
-        return analyse_jd(request.jd_text)
+        return await analyse_jd_async(request.jd_text, mode=request.mode)
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.post("/analyse/batch")
+async def analyse_batch_route(request: AnalyseBatchRequest):
+    """
+    Accepts {jd_texts: [str]}, returns {results: [...]} in input order, each shaped like /analyse.
+    JDs are packed into as few LLM calls as the token budget allows.
+    """
+    try:
+        with priority(BATCH):
+            return {"results": await analyse_jd_batch_async(request.jd_texts, mode=request.mode)}
     except Exception as e:
         return {"error": str(e)}
 
 @app.post("/fit")
 async def fit_route(request: FitRequest):
     """
-    Accepts {competency_map: dict, jd_analysis: dict, github_url: str, role_summary: str}, returns {fit_score, matched, missing, recommendation, cover_letter}
+    Accepts {competency_map: dict, jd_analysis: dict, github_url: str, role_summary: str, cover_letter_mode?}, returns {fit_score, matched, missing, recommendation, cover_letter}.
+    With cover_letter_mode "draft" the letter is a local draft and the response adds
+    cover_letter_status and cover_letter_job_id; the LLM letter is the job's result.
     """
     try:
+        letter_mode = check_cover_letter_mode(request.cover_letter_mode)
+
         # Calculate initial fit result
-        fit_result = calculate_fit(request.competency_map, request.jd_analysis)
+        with stage_timer("fit_scoring"):
+            fit_result = calculate_fit(request.competency_map, request.jd_analysis)
         
-        # Generate tailored cover letter
-        cover_letter = generate_cover_letter(
-            fit_result=fit_result,
-            competency_map=request.competency_map,
-            role_summary=request.role_summary,
-            github_url=request.github_url
-        )
-        
-        # Attach to the final result
-        fit_result["cover_letter"] = cover_letter
+        # Generate tailored cover letter and attach it to the final result
+        fit_result.update(await cover_letter_fields(
+            fit_result, request.competency_map, request.role_summary, request.github_url, letter_mode
+        ))
         return fit_result
     except Exception as e:
         return {"error": str(e)}
 
+@app.post("/fit/batch")
+async def fit_batch_route(request: FitBatchRequest):
+    """
+    Accepts {competency_maps: [dict], jd_analyses: [dict], top_k?, include_cover_letter?, github_urls?},
+    returns {results: [...]} ranked by fit_score, each tagged with candidate_index and jd_index.
+    Cover letters are skipped unless include_cover_letter is set.
+    """
+    try:
+        with stage_timer("fit_scoring_batch"):
+            results = calculate_fit_batch(request.competency_maps, request.jd_analyses, top_k=request.top_k)
+        if request.include_cover_letter:
+            with priority(BATCH):
+                letters = await asyncio.gather(*[
+                    generate_cover_letter_async(
+                        fit_result=result,
+                        competency_map=request.competency_maps[result["candidate_index"]],
+                        role_summary=request.jd_analyses[result["jd_index"]].get('role_summary', 'open role'),
+                        github_url=request.github_urls[result["candidate_index"]] if request.github_urls else ""
+                    )
+                    for result in results
+                ])
+            for result, letter in zip(results, letters):
+                result["cover_letter"] = letter
+        return {"results": results}
+    except Exception as e:
+        return {"error": str(e)}
+
 @app.post("/full-analysis")
 async def full_analysis_route(
     github_url: str = Form(...),
     jd_text: str = Form(...),
-    resume: Optional[UploadFile] = File(None)
+    resume: Optional[UploadFile] = File(None),
+    backend: Optional[str] = Form(None),
+    mode: Optional[str] = Form(None),
+    cover_letter_mode: Optional[str] = Form(None)
 ):
     """
     Accepts Form[github_url, jd_text] and optional File[resume] and runs the full pipeline.
+    GitHub ingestion, resume parsing and JD analysis run concurrently; per-stage
+    wall times are returned under "timings". cover_letter_mode works as on /fit.
     """
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    github_task = resume_task = jd_task = None
     try:
-        # 1. Ingest GitHub profile
-        competency_map = get_competency_map(github_url)
+        letter_mode = check_cover_letter_mode(cover_letter_mode)
+        pdf_bytes = await resume.read(RESUME_MAX_BYTES + 1) if resume else None
+
+        # 1. Ingest GitHub, parse the resume and analyse the JD concurrently
+        github_task, resume_task, jd_task = start_stages(github_url, jd_text, pdf_bytes, backend, mode, timings)
+
+        competency_map = await github_task
         if "error" in competency_map:
+            cancel_all(resume_task, jd_task)
             return {"error": f"GitHub extraction failed: {competency_map['error']}"}
 
-        # 2. Extract and Merge Resume Skills (if provided)
-        if resume:
-            pdf_bytes = await resume.read()
-            resume_skills = extract_resume_skills(pdf_bytes)
-            for skill in resume_skills:
-                if skill not in competency_map:
-                    competency_map[skill] = 0.85
-                else:
-                    competency_map[skill] = min(1.0, competency_map[skill] + 0.1)
-        
-        # 3. Analyse Job Description
-        jd_analysis = analyse_jd(jd_text)
+        # 2. Merge Resume Skills (if provided)
+        if resume_task:
+            merge_resume_skills(competency_map, await resume_task)
+
+        jd_analysis = await jd_task
         if "error" in jd_analysis:
             return {"error": f"JD analysis failed: {jd_analysis['error']}"}
-            
+
         # 3. Calculate Fit and Generate Cover Letter
+        fit_start = time.perf_counter()
         fit_result = calculate_fit(competency_map, jd_analysis)
-        
-        cover_letter = generate_cover_letter(
-            fit_result=fit_result,
-            competency_map=competency_map,
-            role_summary=jd_analysis.get('role_summary', 'open role'),
-            github_url=github_url
-        )
-        
-        fit_result["cover_letter"] = cover_letter
-        
+        observe_stage("fit_scoring", time.perf_counter() - fit_start)
+        timings["fit_scoring_ms"] = round((time.perf_counter() - fit_start) * 1000, 1)
+
+        fit_result.update(await timed(timings, "cover_letter_ms", cover_letter_fields(
+            fit_result, competency_map, jd_analysis.get('role_summary', 'open role'), github_url, letter_mode
+        )))
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
         return {
             "github_competency": competency_map,
             "jd_analysis": jd_analysis,
-            "fit_analysis": fit_result
+            "fit_analysis": fit_result,
+            "timings": timings
         }
     except Exception as e:
+        cancel_all(github_task, resume_task, jd_task)
         return {"error": str(e)}
 
+@app.post("/full-analysis/stream")
+async def full_analysis_stream_route(
+    github_url: str = Form(...),
+    jd_text: str = Form(...),
+    resume: Optional[UploadFile] = File(None),
+    backend: Optional[str] = Form(None),
+    mode: Optional[str] = Form(None)
+):
+    """
+    Streaming variant of /full-analysis (Server-Sent Events). Emits
+    `competency_map` and `jd_analysis` as each stage completes, then `fit`,
+    then the cover letter as `cover_letter_token` events, and finally `done`
+    with stage timings. Failures are sent as an `error` event.
+    """
+    pdf_bytes = await resume.read(RESUME_MAX_BYTES + 1) if resume else None
+
+    async def events():
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+        github_task, resume_task, jd_task = start_stages(github_url, jd_text, pdf_bytes, backend, mode, timings)
+        try:
+            competency_map = jd_analysis = None
+            pending = {github_task, jd_task}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is github_task:
+                        competency_map = task.result()
+                        if "error" in competency_map:
+                            yield sse("error", {"error": f"GitHub extraction failed: {competency_map['error']}"})
+                            return
+                        if resume_task:
+                            merge_resume_skills(competency_map, await resume_task)
+                        yield sse("competency_map", {"github_competency": competency_map})
+                    else:
+                        jd_analysis = task.result()
+                        if "error" in jd_analysis:
+                            yield sse("error", {"error": f"JD analysis failed: {jd_analysis['error']}"})
+                            return
+                        yield sse("jd_analysis", jd_analysis)
+
+            fit_start = time.perf_counter()
+            fit_result = calculate_fit(competency_map, jd_analysis)
+            observe_stage("fit_scoring", time.perf_counter() - fit_start)
+            timings["fit_scoring_ms"] = round((time.perf_counter() - fit_start) * 1000, 1)
+            yield sse("fit", fit_result)
+
+            letter_start = time.perf_counter()
+            async for token in stream_cover_letter(
+                fit_result=fit_result,
+                competency_map=competency_map,
+                role_summary=jd_analysis.get('role_summary', 'open role'),
+                github_url=github_url
+            ):
+                yield sse("cover_letter_token", {"token": token})
+            timings["cover_letter_ms"] = round((time.perf_counter() - letter_start) * 1000, 1)
+            timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            yield sse("done", {"timings": timings})
+        except Exception as e:
+            yield sse("error", {"error": str(e)})
+        finally:
+            # Also runs when the client disconnects mid-stream.
+            cancel_all(github_task, resume_task, jd_task)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/stats")
+async def stats_route():
+    """
+    Returns cache hit/miss counters for the pipeline stages, and how many
+    requests joined an identical in-flight ingest, analysis or cover letter.
+    """
+    return {
+        "github_cache": github_cache_stats(),
+        "jd_cache": jd_cache_stats(),
+        "resume_cache": resume_cache_stats(),
+        "cover_letter_cache": cover_letter_cache_stats(),
+        "github_rate_limit": rate_limit_status(),
+        "llm_scheduler": SCHEDULER.stats(),
+        "coalesced": {
+            "ingest": ingest_coalescing_stats(),
+            "analyse": jd_coalescing_stats(),
+            "cover_letter": cover_letter_coalescing_stats()
+        }
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_route():
+    """
+    Prometheus text exposition: per-stage latency histograms, cache hits and
+    misses, Groq 429s and token usage, and GitHub error responses.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.post("/demo")
 async def demo_route():
     """
@@ -0,0 +1,146 @@
+import re
+import json
+import configparser
+from typing import Dict, Callable, Iterable, List, Set
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+# Dependency manifests read from a repo's root, in the order they are fetched.
+MANIFEST_FILES = [
+    "requirements.txt", "pyproject.toml", "setup.cfg", "Pipfile",
+    "package.json", "environment.yml", "go.mod", "Cargo.toml"
+]
+
+# npm package names that differ from the PACKAGE_SKILL_MAP spelling.
+NPM_ALIASES = {
+    "next": "nextjs", "nuxt": "nuxtjs", "@angular/core": "angular",
+    "@sveltejs/kit": "svelte", "react-dom": "react", "@vitejs/plugin-react": "vite",
+}
+
+_SEPARATORS = re.compile(r"[-_.]+")
+# Leading PEP 508 name, which drops extras, version specifiers and markers.
+_REQUIREMENT_NAME = re.compile(r"\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+_EGG_NAME = re.compile(r"#egg=([A-Za-z0-9._-]+)")
+# "- numpy=1.26", "- conda-forge::pytorch", "  - fastapi[all]>=0.100" (pip section)
+_CONDA_DEPENDENCY = re.compile(r"^\s*-\s*(?:[\w.-]+::)?([A-Za-z0-9][A-Za-z0-9._-]*)", re.MULTILINE)
+# "github.com/gin-gonic/gin v1.9.1", inside or outside a require block
+_GO_REQUIREMENT = re.compile(r"^\s*(?:require\s+)?([\w.-]+\.[a-z]{2,}/\S+)\s+v\d", re.MULTILINE)
+_GO_MAJOR_VERSION = re.compile(r"v\d+$")
+
+def normalize_package_name(name: str) -> str:
+    """Lowercases and folds runs of '-', '_' and '.' into '-' (PEP 503)."""
+    return _SEPARATORS.sub("-", name.strip().lower())
+
+def _requirement_names(lines: Iterable[str]) -> List[str]:
+    names = []
+    for line in lines:
+        line = line.split(" #", 1)[0].strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("-"):
+            # pip options (-r, -e, --index-url); editable installs may name an egg
+            egg = _EGG_NAME.search(line)
+            if egg:
+                names.append(egg.group(1))
+            continue
+        match = _REQUIREMENT_NAME.match(line)
+        if match:
+            names.append(match.group(1))
+    return names
+
+def _parse_requirements(content: str) -> List[str]:
+    return _requirement_names(content.splitlines())
+
+def _parse_pyproject(content: str) -> List[str]:
+    data = tomllib.loads(content)
+    project = data.get("project", {})
+    names = _requirement_names(project.get("dependencies", []))
+    for extra in project.get("optional-dependencies", {}).values():
+        names += _requirement_names(extra)
+    for group in data.get("dependency-groups", {}).values():
+        names += _requirement_names(item for item in group if isinstance(item, str))
+    poetry = data.get("tool", {}).get("poetry", {})
+    names += [name for name in poetry.get("dependencies", {}) if name != "python"]
+    names += list(poetry.get("dev-dependencies", {}))
+    for group in poetry.get("group", {}).values():
+        names += list(group.get("dependencies", {}))
+    return names
+
+def _parse_setup_cfg(content: str) -> List[str]:
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read_string(content)
+    names = []
+    if parser.has_section("options"):
+        for key in ("install_requires", "tests_require"):
+            names += _requirement_names(parser.get("options", key, fallback="").splitlines())
+    if parser.has_section("options.extras_require"):
+        for _, value in parser.items("options.extras_require"):
+            names += _requirement_names(value.splitlines())
+    return names
+
+def _parse_pipfile(content: str) -> List[str]:
+    data = tomllib.loads(content)
+    return list(data.get("packages", {})) + list(data.get("dev-packages", {}))
+
+def _parse_package_json(content: str) -> List[str]:
+    data = json.loads(content)
+    names = []
+    for section in ("dependencies", "devDependencies", "peerDependencies", "optionalDependencies"):
+        for name in data.get(section) or {}:
+            names.append(NPM_ALIASES.get(name, name))
+            if name.startswith("@") and "/" in name:
+                # @vue/cli -> vue, @angular/forms -> angular
+                names.append(name[1:].split("/", 1)[0])
+    return names
+
+def _parse_environment_yml(content: str) -> List[str]:
+    return _CONDA_DEPENDENCY.findall(content)
+
+def _parse_go_mod(content: str) -> List[str]:
+    names = []
+    for module_path in _GO_REQUIREMENT.findall(content):
+        segments = module_path.split("/")
+        if len(segments) > 1 and _GO_MAJOR_VERSION.match(segments[-1]):
+            segments.pop()
+        names.append(segments[-1])
+    return names
+
+def _parse_cargo_toml(content: str) -> List[str]:
+    data = tomllib.loads(content)
+    names = []
+    for section in ("dependencies", "dev-dependencies", "build-dependencies"):
+        names += list(data.get(section, {}))
+    names += list(data.get("workspace", {}).get("dependencies", {}))
+    for target in data.get("target", {}).values():
+        names += list(target.get("dependencies", {}))
+    return names
+
+MANIFEST_PARSERS: Dict[str, Callable[[str], List[str]]] = {
+    "requirements.txt": _parse_requirements,
+    "pyproject.toml": _parse_pyproject,
+    "setup.cfg": _parse_setup_cfg,
+    "Pipfile": _parse_pipfile,
+    "package.json": _parse_package_json,
+    "environment.yml": _parse_environment_yml,
+    "go.mod": _parse_go_mod,
+    "Cargo.toml": _parse_cargo_toml,
+}
+
+_TOML_MANIFESTS = {"pyproject.toml", "Pipfile", "Cargo.toml"}
+
+def parse_manifest(filename: str, content: str) -> Set[str]:
+    """
+    Returns the normalized dependency names declared in a manifest.
+    Unknown or malformed manifests yield an empty set.
+    """
+    parser = MANIFEST_PARSERS.get(filename)
+    if parser is None or (filename in _TOML_MANIFESTS and tomllib is None):
+        return set()
+    try:
+        return {normalize_package_name(name) for name in parser(content)}
+    except (ValueError, TypeError, AttributeError, configparser.Error) as e:
+        print(f"Skipping malformed {filename}: {e}")
+        return set()
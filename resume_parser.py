@@ -1,72 +1,219 @@
 import io
-from typing import Set
+import os
+import asyncio
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Optional, Set, Tuple
+from cache import TTLCache
+from keyword_matcher import AhoCorasick
+from metrics import stage_timer
 
 try:
     import PyPDF2
 except ImportError:
     PyPDF2 = None
 
-def extract_resume_skills(pdf_bytes: bytes) -> Set[str]:
+# Hard limits so an oversized upload cannot pin a worker.
+RESUME_MAX_BYTES = int(os.getenv("RESUME_MAX_BYTES", str(5 * 1024 * 1024)))
+RESUME_MAX_PAGES = int(os.getenv("RESUME_MAX_PAGES", "20"))
+RESUME_PARSE_WORKERS = int(os.getenv("RESUME_PARSE_WORKERS", "2"))
+# Seconds a worker process may spend on one PDF before it is killed.
+RESUME_PARSE_TIMEOUT = float(os.getenv("RESUME_PARSE_TIMEOUT", "30"))
+
+# Parsed resumes keyed by the SHA-256 of the PDF bytes, so re-uploading the
+# same file for another job posting skips PyPDF2. Kept in memory only:
+# resume text is personal data and should not land in the on-disk cache.
+RESUME_CACHE = TTLCache(
+    "resume",
+    max_entries=int(os.getenv("RESUME_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("RESUME_CACHE_TTL", "86400")),
+    db_path=None,
+    max_bytes=int(os.getenv("RESUME_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+)
+
+SKILL_KEYWORDS = {
+    "python": "Python",
+    "javascript": "JavaScript",
+    "react": "frontend",
+    "fastapi": "backend",
+    "flask": "backend",
+    "django": "backend",
+    "machine learning": "ml",
+    "deep learning": "deep-learning",
+    "nlp": "nlp",
+    "natural language": "nlp",
+    "computer vision": "computer-vision",
+    "opencv": "computer-vision",
+    "tensorflow": "deep-learning",
+    "pytorch": "deep-learning",
+    "langchain": "llm-agents",
+    "large language": "llm-agents",
+    "llm": "llm-agents",
+    "llms": "llm-agents",
+    "docker": "devops",
+    "kubernetes": "devops",
+    "aws": "cloud",
+    "azure": "cloud",
+    "sql": "backend",
+    "mysql": "backend",
+    "postgresql": "backend",
+    "mongodb": "backend",
+    "git": "devops",
+    "rest api": "backend",
+    "rest apis": "backend",
+    "node": "backend",
+    "java": "Java",
+    "c++": "C++",
+    "data analysis": "ml",
+    "pandas": "ml",
+    "numpy": "ml",
+}
+
+# One pass over each page finds every keyword; word boundaries keep "java" out
+# of "javascript" and "git" out of "github".
+_SKILL_MATCHER = AhoCorasick(SKILL_KEYWORDS, word_boundary=True)
+_MAX_KEYWORD_LEN = max(len(keyword) for keyword in SKILL_KEYWORDS)
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+def resume_cache_key(pdf_bytes: bytes) -> str:
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+def cache_stats() -> dict:
+    return RESUME_CACHE.stats()
+
+def _parse_pdf(pdf_bytes: bytes) -> Optional[Tuple[str, Set[str]]]:
     """
-    Reads a PDF from bytes, extracts text, and returns a set of matched skill categories.
-    Returns an empty set if PyPDF2 is unavailable or if parsing fails.
+    Extracts the (whitespace-collapsed, lowercased) text of a PDF and the
+    skill categories it mentions. Pages are scanned one at a time, up to
+    RESUME_MAX_PAGES. Returns None if parsing fails.
     """
-    if PyPDF2 is None:
-        print("Warning: PyPDF2 is not installed. Cannot parse resume.")
-        return set()
-
     try:
         reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
-        text = ""
-        for page in reader.pages:
-            extracted = page.extract_text()
-            if extracted:
-                text += extracted
-        
-        text_lower = text.lower()
+        pages = []
         matched_categories = set()
-        
-        skill_keywords = {
-            "python": "Python",
-            "javascript": "JavaScript", 
-            "react": "frontend",
-            "fastapi": "backend",
-            "flask": "backend",
-            "django": "backend",
-            "machine learning": "ml",
-            "deep learning": "deep-learning",
-            "nlp": "nlp",
-            "natural language": "nlp",
-            "computer vision": "computer-vision",
-            "opencv": "computer-vision",
-            "tensorflow": "deep-learning",
-            "pytorch": "deep-learning",
-            "langchain": "llm-agents",
-            "large language": "llm-agents",
-            "llm": "llm-agents",
-            "docker": "devops",
-            "kubernetes": "devops",
-            "aws": "cloud",
-            "azure": "cloud",
-            "sql": "backend",
-            "postgresql": "backend",
-            "mongodb": "backend",
-            "git": "devops",
-            "rest api": "backend",
-            "node": "backend",
-            "java": "Java",
-            "c++": "C++",
-            "data analysis": "ml",
-            "pandas": "ml",
-            "numpy": "ml",
-        }
-        
-        for keyword, category in skill_keywords.items():
-            if keyword in text_lower:
-                matched_categories.add(category)
-                
-        return matched_categories
+        # Last whole words of the previous page, so a phrase split across
+        # pages ("machine" / "learning") still matches.
+        carry = ""
+        for page in islice(reader.pages, RESUME_MAX_PAGES):
+            extracted = page.extract_text()
+            if not extracted:
+                continue
+            page_text = " ".join(extracted.lower().split())
+            pages.append(page_text)
+            text = carry + page_text
+            for keyword in _SKILL_MATCHER.find(text):
+                matched_categories.add(SKILL_KEYWORDS[keyword])
+            tail = text[-_MAX_KEYWORD_LEN:]
+            carry = tail[tail.find(" ") + 1:] + " " if " " in tail else ""
+
+        return " ".join(pages), matched_categories
 
     except Exception as e:
         print(f"Failed to parse PDF resume: {e}")
+        return None
+
+def _check_upload(pdf_bytes: bytes) -> bool:
+    if PyPDF2 is None:
+        print("Warning: PyPDF2 is not installed. Cannot parse resume.")
+        return False
+
+    if len(pdf_bytes) > RESUME_MAX_BYTES:
+        print(f"Warning: resume is {len(pdf_bytes)} bytes, over the {RESUME_MAX_BYTES} byte limit. Skipping.")
+        return False
+    return True
+
+def _store(cache_key: str, parsed: Optional[Tuple[str, Set[str]]]) -> Set[str]:
+    if parsed is None:
+        return set()
+    text, skills = parsed
+    RESUME_CACHE.set(cache_key, {"text": text, "skills": sorted(skills)})
+    return skills
+
+def extract_resume_skills(pdf_bytes: bytes) -> Set[str]:
+    """
+    Reads a PDF from bytes, extracts text, and returns a set of matched skill categories.
+    PDFs over RESUME_MAX_BYTES are rejected; a PDF seen before is answered
+    from RESUME_CACHE without parsing.
+    Returns an empty set if PyPDF2 is unavailable or if parsing fails.
+    """
+    if not _check_upload(pdf_bytes):
+        return set()
+
+    cache_key = resume_cache_key(pdf_bytes)
+    cached = RESUME_CACHE.get(cache_key)
+    if cached is not None:
+        return set(cached["skills"])
+    with stage_timer("resume_parse"):
+        parsed = _parse_pdf(pdf_bytes)
+    return _store(cache_key, parsed)
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # spawn rather than fork: the server process runs threads.
+            _process_pool = ProcessPoolExecutor(
+                max_workers=RESUME_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _process_pool
+
+def _discard_process_pool(pool: ProcessPoolExecutor, kill: bool = False) -> None:
+    """
+    Drops a broken or stuck pool so the next parse starts a fresh one. With
+    kill, its workers are terminated first: a task already running can't be
+    cancelled, and a stuck one would otherwise keep its slot. Parses still
+    in flight on the pool then fail with BrokenProcessPool.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    if kill:
+        # ProcessPoolExecutor has no public way to stop a running task.
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_process_pool() -> None:
+    """Stops the parse workers; called from the FastAPI lifespan on shutdown."""
+    pool = _process_pool
+    if pool is not None:
+        _discard_process_pool(pool)
+
+async def extract_resume_skills_async(pdf_bytes: bytes) -> Set[str]:
+    """
+    Same as extract_resume_skills, but parses in a worker process so large
+    PDFs don't block the event loop. The cache lives in this process, so hits
+    never reach the pool. A parse that crashes its worker or runs past
+    RESUME_PARSE_TIMEOUT returns an empty set, like any other parse failure,
+    and the pool is replaced.
+    """
+    if not _check_upload(pdf_bytes):
         return set()
+
+    cache_key = resume_cache_key(pdf_bytes)
+    cached = RESUME_CACHE.get(cache_key)
+    if cached is not None:
+        return set(cached["skills"])
+    loop = asyncio.get_running_loop()
+    # Timed here rather than in _parse_pdf: the worker process's metrics are not collected.
+    pool = _get_process_pool()
+    with stage_timer("resume_parse"):
+        try:
+            parsed = await asyncio.wait_for(loop.run_in_executor(pool, _parse_pdf, pdf_bytes), RESUME_PARSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"Warning: resume parse exceeded {RESUME_PARSE_TIMEOUT}s, restarting the parse workers.")
+            _discard_process_pool(pool, kill=True)
+            return set()
+        except BrokenProcessPool as e:
+            print(f"Resume parse worker died, restarting the parse workers: {e}")
+            _discard_process_pool(pool)
+            return set()
+    return _store(cache_key, parsed)
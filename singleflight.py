@@ -0,0 +1,167 @@
+import os
+import time
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+from cache import CacheBackend
+
+# Cross-process coalescing: how long a worker's claim on a key lasts if it
+# dies without releasing it, how often other workers check on it, and how
+# long the shared result is kept for them to pick up.
+FLIGHT_LEASE_TTL = float(os.getenv("FLIGHT_LEASE_TTL", "300"))
+FLIGHT_POLL = 0.1
+FLIGHT_RESULT_TTL = 60
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Any = None
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution: the
+    first caller runs the work, callers arriving while it is in flight wait
+    for it and get the same result (or exception). Once it finishes the key is
+    released, so later calls run again; caching is left to the caller.
+
+    `do` is for code running on threads, `ado` for coroutines on one event
+    loop. The shared result is never handed out: every caller, the leader
+    included, gets its own deep copy, so one request mutating its result
+    can't leak into another's.
+
+    With a shared backend the work is also coalesced across worker
+    processes: the leader takes a lease on the key, and leaders in other
+    processes wait for it and read the (JSON) result it publishes. If the
+    lease holder fails or its lease expires, the next one runs the work.
+    """
+
+    def __init__(self, name: str, backend: Optional[CacheBackend] = None):
+        self.name = name
+        self.backend = backend if backend is not None and backend.shared else None
+        self.executions = 0
+        self.coalesced = 0
+        self.coalesced_remote = 0
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def _results(self) -> str:
+        return f"flight:{self.name}"
+
+    def _claim(self, key: str, since: float) -> Any:
+        """
+        One attempt at the cross-process lease: (token, None) when this process
+        should run the work, (None, (result,)) when another worker has
+        published a result since `since`, (None, None) to keep waiting.
+        """
+        # Result first: once the leader publishes, it also frees the lease.
+        entry = self.backend.get(self._results, key)
+        if entry is not None and entry[0] >= since:
+            return None, (entry[2],)
+        return self.backend.acquire_lease(self.name, key, FLIGHT_LEASE_TTL), None
+
+    def _publish(self, key: str, token: str, result: Any) -> None:
+        try:
+            self.backend.set(self._results, key, (time.time(), None, result))
+            self.backend.prune(self._results, FLIGHT_RESULT_TTL)
+        finally:
+            self.backend.release_lease(self.name, key, token)
+
+    def _run_shared(self, key: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if self.backend is None:
+            return fn(*args, **kwargs)
+        started = time.time()
+        waiting = False
+        while True:
+            token, published = self._claim(key, started)
+            if published is not None:
+                return published[0]
+            if token is not None:
+                break
+            if not waiting:
+                waiting = True
+                self.coalesced_remote += 1
+            time.sleep(FLIGHT_POLL)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            self.backend.release_lease(self.name, key, token)
+            raise
+        self._publish(key, token, result)
+        return result
+
+    async def _arun_shared(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if self.backend is None:
+            return await fn()
+        # Backend calls are SQLite reads and commits that can wait on another
+        # worker's write lock; they run on a thread to keep the event loop free.
+        started = time.time()
+        waiting = False
+        while True:
+            token, published = await asyncio.to_thread(self._claim, key, started)
+            if published is not None:
+                return published[0]
+            if token is not None:
+                break
+            if not waiting:
+                waiting = True
+                self.coalesced_remote += 1
+            await asyncio.sleep(FLIGHT_POLL)
+        try:
+            result = await fn()
+        except BaseException:
+            await asyncio.to_thread(self.backend.release_lease, self.name, key, token)
+            raise
+        await asyncio.to_thread(self._publish, key, token, result)
+        return result
+
+    def do(self, key: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = self._run_shared(key, fn, *args, **kwargs)
+            return copy.deepcopy(call.result)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(self._arun_shared(key, fn))
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so a leader that gets cancelled doesn't cancel the work
+        # for everyone waiting on it.
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_remote": self.coalesced_remote,
+            "in_flight": len(self._calls) + len(self._tasks)
+        }
@@ -0,0 +1,192 @@
+"""
+Skill-similarity index for fit scoring. Every term the pipeline knows (the
+PACKAGE_SKILL_MAP packages and categories, resume keywords, JD aliases and
+spellings) gets a hashed character n-gram vector; a JD skill is resolved to
+its nearest known term and from there to the competency keys that term
+implies ("Hugging Face" -> transformers -> nlp, "PostgreSQL" -> backend).
+
+The vectors are built offline and memory-mapped at runtime:
+
+    python skill_index.py            # writes skill_index.npy + skill_index.json
+"""
+import os
+import re
+import json
+import zlib
+import hashlib
+import argparse
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SKILL_INDEX_PATH = os.getenv("SKILL_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "skill_index"))
+# Cosine similarity a JD skill needs with its nearest term to count as that term.
+SKILL_MATCH_THRESHOLD = float(os.getenv("SKILL_MATCH_THRESHOLD", "0.55"))
+SKILL_INDEX_DIM = 1024
+NGRAM = 3
+# Resolved JD skills kept in memory; the set is cleared when it grows past this.
+RESOLVED_CACHE_SIZE = 10000
+
+def normalize_term(term: str) -> str:
+    """Lowercase, punctuation other than + and # as spaces: "Node.js" -> "node js"."""
+    return " ".join(re.sub(r"[^a-z0-9+#]+", " ", term.lower()).split())
+
+def _features(term: str) -> Iterable[Tuple[int, float]]:
+    """(hashed dimension, signed weight) pairs: character n-grams plus whole words."""
+    text = f" {normalize_term(term)} "
+    for i in range(max(len(text) - NGRAM + 1, 1)):
+        yield _hash(text[i:i + NGRAM]), 1.0
+    for word in text.split():
+        yield _hash("w:" + word), 2.0
+    # Spacing-insensitive n-grams, so "nodejs" still lands near "node js".
+    compact = f" {text.replace(' ', '')} "
+    for i in range(max(len(compact) - NGRAM + 1, 1)):
+        yield _hash("c:" + compact[i:i + NGRAM]), 0.5
+
+def _hash(feature: str) -> int:
+    # Signed: the top bit picks the sign so colliding features tend to cancel out.
+    h = zlib.crc32(feature.encode("utf-8"))
+    return (h % SKILL_INDEX_DIM) * (1 if h & 0x80000000 else -1)
+
+def embed(terms: Sequence[str]) -> "np.ndarray":
+    """L2-normalized float32 vectors, one row per term."""
+    vectors = np.zeros((len(terms), SKILL_INDEX_DIM), dtype=np.float32)
+    for row, term in enumerate(terms):
+        for signed_dim, weight in _features(term):
+            vectors[row, abs(signed_dim)] += weight if signed_dim >= 0 else -weight
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def build_vocabulary() -> Dict[str, List[str]]:
+    """
+    Maps every known term (normalized) to the lowercased competency keys and
+    terms it implies, following package -> category and spelling -> canonical
+    term links until nothing new is reached.
+    """
+    from github_ingestor import PACKAGE_SKILL_MAP
+    from resume_parser import SKILL_KEYWORDS
+    from fit_scorer import ALIASES
+    from jd_rules import EXTRA_TERMS
+
+    links: Dict[str, Set[str]] = {}
+    def link(term: str, *targets: str) -> None:
+        links.setdefault(term.lower(), set()).update(target.lower() for target in targets)
+
+    for package, category in PACKAGE_SKILL_MAP.items():
+        link(package, category)
+        link(category)
+    for keyword, category in SKILL_KEYWORDS.items():
+        link(keyword, category)
+        link(category)
+    for skill, terms in ALIASES.items():
+        link(skill, *terms)
+        for term in terms:
+            link(term)
+    for term, canonical in EXTRA_TERMS.items():
+        link(term, canonical)
+        link(canonical)
+
+    vocabulary: Dict[str, List[str]] = {}
+    for term in links:
+        implied, stack = set(), [term]
+        while stack:
+            current = stack.pop()
+            if current not in implied:
+                implied.add(current)
+                stack.extend(links.get(current, ()))
+        vocabulary.setdefault(normalize_term(term), set()).update(implied)
+    return {term: sorted(implied) for term, implied in sorted(vocabulary.items()) if term}
+
+def _vocabulary_hash(vocabulary: Dict[str, List[str]]) -> str:
+    payload = json.dumps([vocabulary, SKILL_INDEX_DIM, NGRAM], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def build_index(path: str = SKILL_INDEX_PATH) -> Dict[str, int]:
+    """Writes <path>.npy (the term vectors) and <path>.json (terms and what they imply)."""
+    vocabulary = build_vocabulary()
+    terms = list(vocabulary)
+    np.save(f"{path}.npy", embed(terms))
+    with open(f"{path}.json", "w") as f:
+        json.dump({
+            "version": _vocabulary_hash(vocabulary),
+            "dim": SKILL_INDEX_DIM,
+            "terms": terms,
+            "implies": [vocabulary[term] for term in terms]
+        }, f)
+    return {"terms": len(terms), "dim": SKILL_INDEX_DIM}
+
+class SkillIndex:
+    """
+    Nearest-neighbour lookup over the known terms. resolve() embeds a batch
+    of JD skills and scores them against every term in one matrix product.
+    """
+
+    def __init__(self, terms: List[str], implies: List[List[str]], vectors: "np.ndarray"):
+        self.terms = terms
+        self.implies = implies
+        self.vectors = vectors
+        self._resolved: Dict[str, Tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str = SKILL_INDEX_PATH) -> "SkillIndex":
+        """Memory-maps a built index, or builds one in memory if it is missing or stale."""
+        vocabulary = build_vocabulary()
+        try:
+            with open(f"{path}.json") as f:
+                meta = json.load(f)
+            if meta.get("version") != _vocabulary_hash(vocabulary):
+                print(f"Warning: {path}.npy is out of date, rebuild it with `python skill_index.py`")
+            else:
+                return cls(meta["terms"], meta["implies"], np.load(f"{path}.npy", mmap_mode="r"))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: skill index {path}.npy unavailable ({e}), building it in memory")
+        terms = list(vocabulary)
+        return cls(terms, [vocabulary[term] for term in terms], embed(terms))
+
+    def resolve(self, skills: Iterable[str]) -> Dict[str, Tuple[str, ...]]:
+        """Maps each skill (lowercased) to the competency keys its nearest term implies, () if none is close enough."""
+        wanted = {skill.lower() for skill in skills}
+        missing = [skill for skill in wanted if skill not in self._resolved]
+        if missing:
+            similarity = embed(missing) @ self.vectors.T
+            nearest = similarity.argmax(axis=1)
+            best = similarity[np.arange(len(missing)), nearest]
+            with self._lock:
+                if len(self._resolved) > RESOLVED_CACHE_SIZE:
+                    self._resolved.clear()
+                for skill, row, score in zip(missing, nearest.tolist(), best.tolist()):
+                    self._resolved[skill] = tuple(self.implies[row]) if score >= SKILL_MATCH_THRESHOLD else ()
+        resolved = self._resolved
+        return {skill: resolved.get(skill, ()) for skill in wanted}
+
+_index: Optional[SkillIndex] = None
+_index_lock = threading.Lock()
+
+def get_index() -> Optional[SkillIndex]:
+    """The process-wide index, loaded on first use; None without NumPy."""
+    global _index
+    if np is None:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SkillIndex.load()
+    return _index
+
+def resolve_skills(skills: Iterable[str]) -> Dict[str, Tuple[str, ...]]:
+    index = get_index()
+    return index.resolve(skills) if index is not None else {}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the skill-similarity index used by fit scoring.")
+    parser.add_argument("--path", default=SKILL_INDEX_PATH, help="output path without extension")
+    args = parser.parse_args()
+    if np is None:
+        raise SystemExit("numpy is required to build the skill index")
+    stats = build_index(args.path)
+    print(f"Wrote {args.path}.npy and {args.path}.json: {stats['terms']} terms x {stats['dim']} dims")